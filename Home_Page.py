@@ -13,6 +13,8 @@ Welcome to our Stock Research Platform! This comprehensive web application lever
 2. **Stock Analysis Dashboard**: Interactive tool for analyzing individual stocks with real-time data, company information, and dynamic candlestick charts
 3. **AI Stock Analyst**: AI Guided comparison tool that evaluates two stocks side-by-side and provides personalized investment recommendations based on your risk profile.
 4. **Stock Chat Bot**: Interactive chat interface that answers questions about specific stocks using real-time market data and company fundamentals.
+5. **Watchlist**: Sortable table of live quotes for a whole list of stocks, refreshed in bulk.
+6. **Stock Screener**: Filter and sort companies by cached fundamentals such as P/E, beta, dividend yield and growth.
 ---
 
 ### About This Application
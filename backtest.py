@@ -0,0 +1,189 @@
+import numpy as np
+import pandas as pd
+
+from indicators import PERIODS_PER_YEAR
+
+
+REBALANCE_EVERY = {"Daily": 21, "Weekly": 4, "Monthly": 1}
+SIGNAL_WINDOWS = (50, 200)
+RISK_FREE_RATE = 0.0
+STRATEGIES = ("buy_and_hold", "rebalanced", "sma_crossover")
+
+
+def price_matrix(histories):
+    # one close column per symbol on the union of dates; a symbol stays NaN
+    # until its first bar and carries its last close over missing days
+    closes = {
+        symbol: frame["close"].astype(np.float64)
+        for symbol, frame in histories.items()
+        if frame is not None and len(frame)
+    }
+    if not closes:
+        return pd.DataFrame()
+    return pd.DataFrame(closes).sort_index().ffill()
+
+
+def period_returns(prices):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = prices[1:] / prices[:-1] - 1
+    # before a listing the slot sits in cash
+    returns[~np.isfinite(returns)] = 0.0
+    return np.vstack([np.zeros((1, prices.shape[1])), returns])
+
+
+def normalize_weights(weights, count):
+    weights = np.full(count, 1 / count) if weights is None else np.asarray(weights, np.float64)
+    return weights / weights.sum()
+
+
+def buy_and_hold(returns, weights=None):
+    weights = normalize_weights(weights, returns.shape[1])
+    return np.cumprod(1 + returns, axis=0) @ weights
+
+
+def rebalanced(returns, weights=None, every=21):
+    weights = normalize_weights(weights, returns.shape[1])
+    periods = len(returns)
+    group = np.arange(periods) // every
+    starts = np.flatnonzero(np.diff(group, prepend=-1))
+
+    # growth of each holding since its group's rebalance, without a loop
+    log_growth = np.cumsum(np.log1p(returns), axis=0)
+    base = np.vstack([np.zeros((1, returns.shape[1])), log_growth[starts[1:] - 1]])
+    segment = np.exp(log_growth - base[group]) @ weights
+
+    # chain the groups: each one starts from where the previous one ended
+    ends = np.append(starts[1:] - 1, periods - 1)
+    carried = np.concatenate(([1.0], np.cumprod(segment[ends])[:-1]))
+    return segment * carried[group]
+
+
+def moving_average(prices, window):
+    filled = np.nan_to_num(prices)
+    counts = np.cumsum(~np.isnan(prices), axis=0)
+    sums = np.cumsum(filled, axis=0)
+    sums[window:] = sums[window:] - sums[:-window]
+    counts[window:] = counts[window:] - counts[:-window]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(counts == window, sums / counts, np.nan)
+
+
+def sma_crossover(prices, returns, fast=SIGNAL_WINDOWS[0], slow=SIGNAL_WINDOWS[1]):
+    # hold the symbols whose fast average is above the slow one, equally
+    # weighted, deciding on yesterday's close so there is no lookahead
+    signal = moving_average(prices, fast) > moving_average(prices, slow)
+    held = np.vstack([np.zeros((1, prices.shape[1]), bool), signal[:-1]])
+    count = held.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        daily = np.where(count > 0, (returns * held).sum(axis=1) / count, 0.0)
+    return np.cumprod(1 + daily)
+
+
+def drawdown(equity):
+    return equity / np.maximum.accumulate(equity) - 1
+
+
+def equity_metrics(equity, periods_per_year=252):
+    returns = equity[1:] / equity[:-1] - 1
+    years = max(len(returns) / periods_per_year, 1 / periods_per_year)
+    volatility = returns.std() * np.sqrt(periods_per_year) if len(returns) > 1 else 0.0
+    excess = returns.mean() * periods_per_year - RISK_FREE_RATE if len(returns) else 0.0
+    # annualizing a few months of returns says nothing, leave it out
+    cagr = (equity[-1] / equity[0]) ** (1 / years) - 1 if len(returns) >= periods_per_year else np.nan
+    return {
+        "total_return": equity[-1] / equity[0] - 1,
+        "cagr": cagr,
+        "volatility": volatility,
+        "sharpe": excess / volatility if volatility else 0.0,
+        "max_drawdown": drawdown(equity).min(),
+    }
+
+
+def correlation_matrix(prices):
+    # pairwise over the periods both symbols traded, as matrix products
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = prices[1:] / prices[:-1] - 1
+    valid = np.isfinite(returns).astype(np.float64)
+    x = np.where(valid > 0, returns, 0.0)
+
+    n = valid.T @ valid
+    sum_x = x.T @ valid
+    sum_xx = (x * x).T @ valid
+    sum_xy = x.T @ x
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = sum_xy - sum_x * sum_x.T / n
+        var_x = sum_xx - sum_x ** 2 / n
+        corr = cov / np.sqrt(var_x * var_x.T)
+    corr[n < 3] = np.nan
+    np.fill_diagonal(corr, 1.0)
+    return corr
+
+
+def run_backtest(histories, period="Daily", weights=None, strategies=STRATEGIES):
+    matrix = price_matrix(histories)
+    if matrix.empty or len(matrix) < 2:
+        return None
+
+    symbols = list(matrix.columns)
+    prices = matrix.to_numpy()
+    returns = period_returns(prices)
+    periods_per_year = PERIODS_PER_YEAR.get(period, 252)
+
+    curves = {}
+    if "buy_and_hold" in strategies:
+        curves["buy_and_hold"] = buy_and_hold(returns, weights)
+    if "rebalanced" in strategies:
+        curves["rebalanced"] = rebalanced(returns, weights, REBALANCE_EVERY.get(period, 21))
+    if "sma_crossover" in strategies and len(prices) > SIGNAL_WINDOWS[1]:
+        # the slow average never forms on a shorter history and the curve would sit flat in cash
+        curves["sma_crossover"] = sma_crossover(prices, returns)
+    metrics = {name: equity_metrics(curve, periods_per_year) for name, curve in curves.items()}
+
+    # each symbol on its own, measured from its first bar
+    first = np.argmax(~np.isnan(prices), axis=0)
+    held = np.cumprod(1 + returns, axis=0)
+    for i, symbol in enumerate(symbols):
+        curve = held[:, i] / held[first[i], i]
+        curve[:first[i]] = np.nan
+        curves[symbol] = curve
+        metrics[symbol] = equity_metrics(curve[first[i]:], periods_per_year)
+
+    equity = pd.DataFrame(curves, index=matrix.index)
+    metrics = pd.DataFrame(metrics).T
+    correlation = pd.DataFrame(correlation_matrix(prices), index=symbols, columns=symbols)
+    return {"equity": equity, "metrics": metrics, "correlation": correlation, "period": period}
+
+
+def load_histories(symbols, period="Daily", start=None):
+    from functions import get_price_history, to_ohlcv_frame
+
+    histories = {}
+    for symbol in symbols:
+        history = get_price_history(symbol, period, start)
+        histories[symbol] = to_ohlcv_frame(history, symbol, period) if history else None
+    return histories
+
+
+def summarize_backtest(result, names=None):
+    if not result:
+        return ""
+    equity = result["equity"]
+    lines = [
+        f"Backtest {equity.index[0]:%Y-%m-%d} to {equity.index[-1]:%Y-%m-%d} "
+        f"({len(equity)} {result['period'].lower()} bars):"
+    ]
+    for name, row in result["metrics"].iterrows():
+        if names and name not in names:
+            continue
+        cagr = f", CAGR {row['cagr'] * 100:.1f}%" if np.isfinite(row["cagr"]) else ""
+        lines.append(
+            f"{name}: return {row['total_return'] * 100:.1f}%{cagr}, "
+            f"vol {row['volatility'] * 100:.1f}%, Sharpe {row['sharpe']:.2f}, "
+            f"max drawdown {row['max_drawdown'] * 100:.1f}%"
+        )
+
+    correlation = result["correlation"]
+    symbols = list(correlation.columns)
+    if len(symbols) == 2:
+        lines.append(f"Correlation of {symbols[0]} and {symbols[1]} returns: {correlation.iat[0, 1]:.2f}")
+    return "\n".join(lines) + "\n"
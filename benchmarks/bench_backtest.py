@@ -0,0 +1,39 @@
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+from backtest import run_backtest
+
+
+def make_histories(symbols, years):
+    rng = np.random.default_rng(0)
+    periods = years * 252
+    index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=periods)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, (periods, symbols)), axis=0))
+    histories = {}
+    for i in range(symbols):
+        # stagger listings so the alignment path is exercised too
+        listed = rng.integers(0, periods // 4) if i % 5 == 0 else 0
+        histories[f"SYM{i:03d}"] = pd.DataFrame(
+            {"close": closes[listed:, i].astype(np.float32)}, index=index[listed:]
+        )
+    return histories
+
+
+if __name__ == "__main__":
+    symbols = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    years = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    histories = make_histories(symbols, years)
+    print(f"{symbols} symbols x {years} years of daily bars")
+
+    timings = []
+    for _ in range(5):
+        start = time.perf_counter()
+        result = run_backtest(histories)
+        timings.append(time.perf_counter() - start)
+    print(f"run_backtest{min(timings) * 1000:>16.1f} ms")
+    print(result["metrics"].loc[["buy_and_hold", "rebalanced", "sma_crossover"]].round(3))
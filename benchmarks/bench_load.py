@@ -0,0 +1,229 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+from collections import Counter
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from stub_server import StubAlphaVantage, FakeGenerativeModel
+
+PAGES = ("dashboard", "analyst", "bot")
+BOT_QUESTIONS = (
+    "How is {0} doing today?",
+    "Should I worry about {0} at this price?",
+    "Compare {0} and {1} for me",
+    "What's the P/E of {0}?",
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Drive the pages' data paths against a local Alpha Vantage stub.")
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent user sessions")
+    parser.add_argument("--views", type=int, default=25, help="page views per session")
+    parser.add_argument("--symbols", type=int, default=40, help="size of the symbol universe")
+    parser.add_argument("--keys", type=int, default=4)
+    parser.add_argument("--per-minute", type=int, default=75, help="calls per key per minute")
+    parser.add_argument("--cooldown", type=int, default=60, help="seconds a throttled key sits out")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--hang", type=float, default=5.0, help="seconds a simulated timeout hangs")
+    parser.add_argument("--llm-ttft", type=float, default=0.4)
+    parser.add_argument("--llm-tps", type=float, default=120, help="LLM output tokens per second")
+    parser.add_argument("--think", type=float, default=0.0, help="seconds a user pauses between views")
+    parser.add_argument("--fixtures", help="directory of recorded <FUNCTION>.json replies")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="also write the report to this file")
+    return parser.parse_args()
+
+
+def configure(args, url, workdir):
+    # functions.py reads its settings at import time
+    os.environ.update({
+        "ALPHA_VANTAGE_URL": url,
+        "API_KEYS": ",".join(f"bench{i:02d}" for i in range(args.keys)),
+        "KEY_CALLS_PER_MINUTE": str(args.per_minute),
+        "KEY_CALLS_PER_DAY": str(args.per_minute * 60 * 24),
+        "KEY_COOLDOWN": str(args.cooldown),
+        "HISTORY_DB_PATH": str(Path(workdir) / "price_history.db"),
+    })
+    os.environ.pop("CACHE_DB_PATH", None)
+
+
+class LoadTest:
+    def __init__(self, args, model):
+        import functions
+        from indicators import get_indicators
+
+        self.f = functions
+        self.get_indicators = get_indicators
+        self.args = args
+        self.model = model
+        self.symbols = functions.listed_symbols()[:args.symbols]
+        # a few tickers draw most of the traffic, like real watchlists do
+        self.weights = [1 / (rank + 1) for rank in range(len(self.symbols))]
+        self.latencies = {page: [] for page in PAGES}
+        self.degraded = Counter()
+        self.errors = Counter()
+        self.lock = threading.Lock()
+
+    def pick(self, rng, count=1):
+        picked = []
+        while len(picked) < count:
+            symbol = rng.choices(self.symbols, self.weights)[0]
+            if symbol not in picked:
+                picked.append(symbol)
+        return picked
+
+    def dashboard(self, rng):
+        f = self.f
+        symbol, = self.pick(rng)
+        bundle, failed = f.fetch_bundle([symbol], ["quote", "overview", "history"])
+        history = bundle[symbol].get("history")
+        if history:
+            frame = f.to_ohlcv_frame(history, symbol, "Daily")
+            self.get_indicators(frame, symbol, "Daily")
+            f.downsample_ohlcv(frame)
+        return failed
+
+    def analyst(self, rng):
+        f = self.f
+        symbols = self.pick(rng, 2)
+        bundle, failed = f.fetch_bundle(symbols, ["quote", "overview"])
+        summaries = "\n".join(
+            f.Stock(s, bundle[s].get("quote"), bundle[s].get("overview")).summary() for s in symbols
+        )
+        risk = rng.choice(["low", "medium", "high"])
+        prompt = f"Compare these two stocks for someone with {risk} risk tolerance.\n\n{summaries}"
+        for _ in f.stream_generate(self.model, prompt, {"temperature": 0.4, "max_output_tokens": 2000},
+                                   label="comparison", cached=True):
+            pass
+        return failed
+
+    def bot(self, rng):
+        f = self.f
+        question = rng.choice(BOT_QUESTIONS).format(*self.pick(rng, 2))
+        tickers, confident = f.resolve_tickers(question)
+        if not confident:
+            reply = f.generate(self.model, f'Extract tickers from "{question}"', label="ticker_extraction")
+            tickers = list(dict.fromkeys(tickers + f.parse_ticker_list(reply.text)))
+        bundle, failed = f.fetch_bundle(tickers, ["quote", "overview"], timeout=8)
+        summaries = "".join(
+            f.Stock(t, bundle[t].get("quote"), bundle[t].get("overview")).summary() for t in tickers
+        )
+        prompt = f"You are Stocky.\n\nuser: {question}\n\n{summaries}"
+        for _ in f.stream_generate(self.model, prompt, {"temperature": 0.4, "max_output_tokens": 350},
+                                   label="chat"):
+            pass
+        return failed
+
+    def session(self, index):
+        rng = random.Random(self.args.seed * 1000 + index)
+        for _ in range(self.args.views):
+            page = rng.choice(PAGES)
+            start = time.perf_counter()
+            try:
+                failed = getattr(self, page)(rng)
+            except Exception as e:
+                failed = None
+                with self.lock:
+                    self.errors[f"{page}: {type(e).__name__}"] += 1
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.latencies[page].append(elapsed)
+                if failed:
+                    self.degraded[page] += 1
+            if self.args.think:
+                time.sleep(rng.expovariate(1 / self.args.think))
+
+    def run(self):
+        threads = [
+            threading.Thread(target=self.session, args=(i,), name=f"session-{i}")
+            for i in range(self.args.sessions)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))] if samples else 0.0
+
+
+def report(load, stub, model, elapsed):
+    f = load.f
+    views = sum(len(samples) for samples in load.latencies.values())
+    upstream = stub.stats()
+    pages = {}
+    for page, samples in load.latencies.items():
+        pages[page] = {
+            "views": len(samples),
+            "degraded": load.degraded[page],
+            "p50_ms": percentile(samples, 0.50) * 1000,
+            "p95_ms": percentile(samples, 0.95) * 1000,
+            "p99_ms": percentile(samples, 0.99) * 1000,
+        }
+    return {
+        "sessions": load.args.sessions,
+        "views": views,
+        "seconds": elapsed,
+        "views_per_second": views / elapsed if elapsed else 0.0,
+        "api_calls": upstream.get("requests", 0),
+        "api_calls_per_view": upstream.get("requests", 0) / views if views else 0.0,
+        "upstream": upstream,
+        "llm_calls": model.calls,
+        "llm_prompt_tokens_per_call": model.prompt_tokens / model.calls if model.calls else 0.0,
+        "response_cache": f.response_cache.stats(),
+        "llm_cache": f.llm_cache.stats(),
+        "single_flight": f.in_flight.stats(),
+        "pages": pages,
+        "errors": dict(load.errors),
+    }
+
+
+def print_report(result):
+    print(f"{result['sessions']} sessions, {result['views']} views in {result['seconds']:.1f}s "
+          f"({result['views_per_second']:.1f} views/s)")
+    print(f"{'page':<12}{'views':>7}{'degraded':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for page, row in result["pages"].items():
+        print(f"{page:<12}{row['views']:>7}{row['degraded']:>10}"
+              f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}")
+    print(f"API calls {result['api_calls']} ({result['api_calls_per_view']:.2f} per view), "
+          f"response cache hit rate {result['response_cache']['hit_rate'] * 100:.1f}%, "
+          f"coalesced {result['single_flight']['coalesced']}")
+    print(f"LLM calls {result['llm_calls']} ({result['llm_prompt_tokens_per_call']:.0f} prompt tokens each), "
+          f"LLM cache hit rate {result['llm_cache']['hit_rate'] * 100:.1f}%")
+    for outcome, count in sorted(result["upstream"].items()):
+        if outcome != "requests" and not outcome.endswith(":ok"):
+            print(f"    upstream {outcome}: {count}")
+    for error, count in result["errors"].items():
+        print(f"    error {error}: {count}")
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    stub = StubAlphaVantage(latency=args.latency, jitter=args.jitter, throttle_rate=args.throttle_rate,
+                            timeout_rate=args.timeout_rate, hang=args.hang, fixtures=args.fixtures,
+                            seed=args.seed).start()
+    model = FakeGenerativeModel(ttft=args.llm_ttft, tokens_per_second=args.llm_tps)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        configure(args, stub.url, workdir)
+        load = LoadTest(args, model)
+        elapsed = load.run()
+        result = report(load, stub, model, elapsed)
+
+    print_report(result)
+    if args.json:
+        Path(args.json).write_text(json.dumps(result, indent=2))
+    stub.shutdown()
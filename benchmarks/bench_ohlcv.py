@@ -0,0 +1,58 @@
+import sys
+import timeit
+import random
+from datetime import date, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+from functions import to_ohlcv_frame
+
+
+def make_payload(years=25):
+    payload = {}
+    day = date.today()
+    price = 100.0
+    for _ in range(years * 252):
+        day -= timedelta(days=1)
+        price *= 1 + random.gauss(0, 0.01)
+        payload[day.isoformat()] = {
+            "1. open": f"{price:.4f}",
+            "2. high": f"{price * 1.01:.4f}",
+            "3. low": f"{price * 0.99:.4f}",
+            "4. close": f"{price:.4f}",
+            "5. volume": str(random.randint(10**5, 10**8)),
+        }
+    return payload
+
+
+def dashboard_frame(time_series):
+    # the conversion 1_Stock_Analysis_Dashboard.py used before to_ohlcv_frame
+    df = pd.DataFrame.from_dict(time_series, orient='index')
+    df.index = pd.to_datetime(df.index)
+    df = df.sort_index()
+    df.columns = [col.split('. ')[1] for col in df.columns]
+    return df.astype(float)
+
+
+def report(name, func, number):
+    best = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print(f"{name:<28}{best * 1000:>10.2f} ms")
+    return best
+
+
+if __name__ == "__main__":
+    years = int(sys.argv[1]) if len(sys.argv) > 1 else 25
+    payload = make_payload(years)
+    print(f"{len(payload)} daily bars ({years} years)")
+
+    old = report("from_dict + astype", lambda: dashboard_frame(payload), 10)
+    new = report("to_ohlcv_frame", lambda: to_ohlcv_frame(payload), 10)
+    to_ohlcv_frame(payload, "BENCH", "Daily")
+    cached = report("to_ohlcv_frame (cached)", lambda: to_ohlcv_frame(payload, "BENCH", "Daily"), 1000)
+
+    print(f"speedup {old / new:.1f}x, cached {old / cached:.0f}x")
+    frame = to_ohlcv_frame(payload)
+    print(f"memory {dashboard_frame(payload).memory_usage(deep=True).sum() / 1024:.0f} KiB "
+          f"-> {frame.memory_usage(deep=True).sum() / 1024:.0f} KiB")
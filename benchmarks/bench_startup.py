@@ -0,0 +1,57 @@
+import sys
+import json
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+PAGES = [
+    "Home_Page.py",
+    "pages/1_Stock_Analysis_Dashboard.py",
+    "pages/2_AI_Stock_Analyst.py",
+    "pages/3_Stock_Bot.py",
+    "pages/4_Watchlist.py",
+]
+
+# runs in a fresh interpreter so the first run pays every import
+CHILD = """
+import sys, time, json
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+framework = time.perf_counter() - start
+
+at = AppTest.from_file({page!r}, default_timeout=60)
+at.secrets["API_KEYS"] = ["bench"]
+at.secrets["GOOGLE_API_KEY"] = "bench"
+start = time.perf_counter()
+at.run()
+cold = time.perf_counter() - start
+
+warm = []
+for _ in range({reruns}):
+    start = time.perf_counter()
+    at.run()
+    warm.append(time.perf_counter() - start)
+
+print(json.dumps({{"framework": framework, "cold": cold, "warm": sorted(warm)[len(warm) // 2],
+                   "errors": [str(e.value) for e in at.exception]}}))
+"""
+
+
+def measure(page, reruns):
+    code = CHILD.format(root=str(ROOT), page=str(ROOT / page), reruns=reruns)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=ROOT)
+    lines = [line for line in out.stdout.splitlines() if line.startswith("{")]
+    if not lines:
+        raise RuntimeError(out.stderr[-2000:])
+    return json.loads(lines[-1])
+
+
+if __name__ == "__main__":
+    reruns = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    print(f"{'page':<40}{'cold ms':>10}{'warm ms':>10}")
+    for page in PAGES:
+        result = measure(page, reruns)
+        print(f"{page:<40}{result['cold'] * 1000:>10.1f}{result['warm'] * 1000:>10.1f}")
+        for error in result["errors"]:
+            print(f"    error: {error}")
@@ -0,0 +1,335 @@
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import threading
+from collections import Counter
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+THROTTLE_NOTE = (
+    "Thank you for using Alpha Vantage! Our standard API rate limit is 25 requests per day. "
+    "Please subscribe to any of the premium plans to instantly remove all daily rate limits."
+)
+SERIES_KEYS = {
+    "TIME_SERIES_DAILY": "Time Series (Daily)",
+    "TIME_SERIES_DAILY_ADJUSTED": "Time Series (Daily)",
+    "TIME_SERIES_WEEKLY": "Weekly Time Series",
+    "TIME_SERIES_MONTHLY": "Monthly Time Series",
+}
+SERIES_STEP = {"TIME_SERIES_WEEKLY": 5, "TIME_SERIES_MONTHLY": 21}
+INTRADAY_MINUTES = {"1min": 1, "5min": 5, "15min": 15, "30min": 30, "60min": 60}
+SECTORS = ("TECHNOLOGY", "HEALTHCARE", "FINANCIAL SERVICES", "ENERGY", "CONSUMER CYCLICAL")
+COMPACT_BARS = 100
+
+
+def daily_bars(symbol, years):
+    # seeded by symbol so every run and every process sees the same history
+    rng = random.Random(symbol)
+    price = rng.uniform(20, 400)
+    day = date.today()
+    bars = []
+    while len(bars) < years * 252:
+        day -= timedelta(days=1)
+        if day.weekday() >= 5:
+            continue
+        price *= 1 + rng.gauss(0.0003, 0.015)
+        bars.append((day.isoformat(), {
+            "1. open": f"{price * (1 + rng.gauss(0, 0.003)):.4f}",
+            "2. high": f"{price * 1.01:.4f}",
+            "3. low": f"{price * 0.99:.4f}",
+            "4. close": f"{price:.4f}",
+            "5. volume": str(rng.randint(10**5, 10**8)),
+        }))
+    return bars
+
+
+def intraday_bars(symbol, interval, count):
+    # aligned to the wall clock, so a new bar shows up once per interval
+    step = INTRADAY_MINUTES.get(interval, 5) * 60
+    base = random.Random(symbol).uniform(20, 400)
+    now = int(time.time()) // step * step
+    bars = []
+    for stamp in range(now, now - count * step, -step):
+        rng = random.Random(f"{symbol}:{stamp}")
+        price = base * (1 + 0.03 * math.sin(stamp / 7200) + rng.gauss(0, 0.002))
+        bars.append((datetime.fromtimestamp(stamp).strftime("%Y-%m-%d %H:%M:%S"), {
+            "1. open": f"{price * (1 + rng.gauss(0, 0.001)):.4f}",
+            "2. high": f"{price * 1.002:.4f}",
+            "3. low": f"{price * 0.998:.4f}",
+            "4. close": f"{price:.4f}",
+            "5. volume": str(rng.randint(10**3, 10**6)),
+        }))
+    return bars
+
+
+class StubAlphaVantage(ThreadingHTTPServer):
+    """Local stand-in for www.alphavantage.co/query.
+
+    Replies with recorded payloads from `fixtures` (one <FUNCTION>.json per
+    endpoint, symbol fields rewritten per request) or synthesized daily and
+    intraday ones, after `latency` +- `jitter` seconds. A `throttle_rate` share
+    of requests get the rate limit Note and a `timeout_rate` share hang for
+    `hang` seconds.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.05, jitter=0.02, throttle_rate=0.0, timeout_rate=0.0,
+                 hang=10.0, years=20, fixtures=None, seed=None):
+        super().__init__(("127.0.0.1", port), StubHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.timeout_rate = timeout_rate
+        self.hang = hang
+        self.years = years
+        self.fixtures = {}
+        if fixtures:
+            for path in Path(fixtures).glob("*.json"):
+                self.fixtures[path.stem.upper()] = json.loads(path.read_text())
+        self.rng = random.Random(seed)
+        self.hits = Counter()
+        self.lock = threading.Lock()
+        self.series = {}
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/query"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="stub-alphavantage", daemon=True).start()
+        return self
+
+    def stats(self):
+        with self.lock:
+            return dict(self.hits)
+
+    def decide(self, function):
+        with self.lock:
+            roll = self.rng.random()
+            delay = max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+            if roll < self.timeout_rate:
+                outcome = "timeout"
+            elif roll < self.timeout_rate + self.throttle_rate:
+                outcome = "throttled"
+            else:
+                outcome = "ok"
+            self.hits["requests"] += 1
+            self.hits[f"{function}:{outcome}"] += 1
+        return outcome, delay
+
+    def reply(self, params):
+        function = params.get("function", "")
+        symbol = params.get("symbol", "DEMO").upper()
+
+        if function in self.fixtures:
+            return self.recorded(function, symbol)
+        if function == "GLOBAL_QUOTE":
+            return self.quote(symbol)
+        if function == "OVERVIEW":
+            return self.overview(symbol)
+        if function in SERIES_KEYS:
+            return self.time_series(function, symbol, params.get("outputsize", "compact"))
+        if function == "TIME_SERIES_INTRADAY":
+            return self.intraday(symbol, params.get("interval", "5min"), params.get("outputsize", "compact"))
+        if function == "REALTIME_BULK_QUOTES":
+            return {"Information": "This is a premium endpoint."}
+        return {"Error Message": f"Invalid API call: {function}"}
+
+    def recorded(self, function, symbol):
+        payload = json.loads(json.dumps(self.fixtures[function]))
+        quote = payload.get("Global Quote")
+        if quote:
+            quote["01. symbol"] = symbol
+        if "Symbol" in payload:
+            payload["Symbol"] = symbol
+        if "Meta Data" in payload:
+            payload["Meta Data"]["2. Symbol"] = symbol
+        return payload
+
+    def bars(self, symbol):
+        with self.lock:
+            bars = self.series.get(symbol)
+        if bars is None:
+            bars = daily_bars(symbol, self.years)
+            with self.lock:
+                self.series[symbol] = bars
+        return bars
+
+    def quote(self, symbol):
+        bars = self.bars(symbol)
+        (day, last), (_, prev) = bars[0], bars[1]
+        close, prev_close = float(last["4. close"]), float(prev["4. close"])
+        return {"Global Quote": {
+            "01. symbol": symbol,
+            "02. open": last["1. open"],
+            "03. high": last["2. high"],
+            "04. low": last["3. low"],
+            "05. price": last["4. close"],
+            "06. volume": last["5. volume"],
+            "07. latest trading day": day,
+            "08. previous close": prev["4. close"],
+            "09. change": f"{close - prev_close:.4f}",
+            "10. change percent": f"{(close / prev_close - 1) * 100:.4f}%",
+        }}
+
+    def overview(self, symbol):
+        rng = random.Random(symbol + ":overview")
+        price = float(self.bars(symbol)[0][1]["4. close"])
+        eps = price / rng.uniform(8, 60)
+        return {
+            "Symbol": symbol,
+            "Name": f"{symbol} Holdings Inc",
+            "Description": f"{symbol} Holdings is a synthetic company served by the benchmark stub.",
+            "Exchange": "NASDAQ",
+            "Currency": "USD",
+            "Sector": rng.choice(SECTORS),
+            "Industry": "SYNTHETIC",
+            "OfficialSite": f"https://www.{symbol.lower()}.example.com",
+            "LatestQuarter": date.today().isoformat(),
+            "MarketCapitalization": str(int(price * rng.uniform(1e8, 1e10))),
+            "PERatio": f"{price / eps:.2f}",
+            "EPS": f"{eps:.2f}",
+            "DividendYield": f"{rng.uniform(0, 0.05):.4f}",
+            "Beta": f"{rng.uniform(0.5, 2):.3f}",
+            "ProfitMargin": f"{rng.uniform(-0.1, 0.4):.4f}",
+            "52WeekHigh": f"{price * 1.3:.2f}",
+            "52WeekLow": f"{price * 0.7:.2f}",
+        }
+
+    def time_series(self, function, symbol, outputsize):
+        bars = self.bars(symbol)[::SERIES_STEP.get(function, 1)]
+        if outputsize != "full":
+            bars = bars[:COMPACT_BARS]
+        return {
+            "Meta Data": {"1. Information": function, "2. Symbol": symbol},
+            SERIES_KEYS[function]: dict(bars),
+        }
+
+
+    def intraday(self, symbol, interval, outputsize):
+        if interval not in INTRADAY_MINUTES:
+            return {"Error Message": f"Invalid API call: interval {interval}"}
+        # full intraday output covers roughly the last month of trading
+        count = COMPACT_BARS if outputsize != "full" else 30 * 16 * 60 // INTRADAY_MINUTES[interval]
+        return {
+            "Meta Data": {"1. Information": "Intraday", "2. Symbol": symbol, "4. Interval": interval},
+            f"Time Series ({interval})": dict(intraday_bars(symbol, interval, count)),
+        }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        outcome, delay = self.server.decide(params.get("function", ""))
+
+        if outcome == "timeout":
+            time.sleep(self.server.hang)
+        time.sleep(delay)
+
+        if outcome == "throttled":
+            payload = {"Note": THROTTLE_NOTE}
+        else:
+            payload = self.server.reply(params)
+
+        body = json.dumps(payload).encode("utf-8")
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # the client gave up on a simulated timeout
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeUsage:
+    def __init__(self, prompt_tokens, output_tokens):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = output_tokens
+
+
+class FakeChunk:
+    def __init__(self, text, usage=None):
+        self.text = text
+        self.usage_metadata = usage
+
+
+class FakeGenerativeModel:
+    """Drop-in for genai.GenerativeModel that never leaves the machine.
+
+    Waits `ttft` seconds before the first chunk and then streams
+    `output_tokens` words at `tokens_per_second`, `chunk_tokens` per chunk.
+    """
+
+    def __init__(self, model_name="models/fake", ttft=0.4, tokens_per_second=120, output_tokens=200,
+                 chunk_tokens=20):
+        self.model_name = model_name
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.output_tokens = output_tokens
+        self.chunk_tokens = chunk_tokens
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.lock = threading.Lock()
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        limit = (generation_config or {}).get("max_output_tokens", self.output_tokens)
+        words = min(self.output_tokens, limit)
+        # roughly four characters per token, like the real tokenizer on English
+        prompt_tokens = len(prompt) // 4
+        with self.lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+        chunks = self._chunks(words, prompt_tokens)
+        if stream:
+            return chunks
+        return FakeChunk("".join(chunk.text for chunk in chunks), FakeUsage(prompt_tokens, words))
+
+    def _chunks(self, words, prompt_tokens):
+        time.sleep(self.ttft)
+        sent = 0
+        while sent < words:
+            size = min(self.chunk_tokens, words - sent)
+            if sent:
+                time.sleep(size / self.tokens_per_second)
+            sent += size
+            usage = FakeUsage(prompt_tokens, words) if sent == words else None
+            yield FakeChunk("lorem " * size, usage)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local Alpha Vantage stand-in.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--hang", type=float, default=10.0)
+    parser.add_argument("--years", type=int, default=20)
+    parser.add_argument("--fixtures", help="directory of recorded <FUNCTION>.json replies")
+    args = parser.parse_args()
+
+    server = StubAlphaVantage(args.port, args.latency, args.jitter, args.throttle_rate,
+                              args.timeout_rate, args.hang, args.years, args.fixtures)
+    print(f"serving on {server.url}, point ALPHA_VANTAGE_URL at it", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# an app of its own, kept out of pages/ so it never shows in the sidebar:
+#   streamlit run diagnostics.py --server.port 8502
+import streamlit as st
+
+from functions import (
+    get_setting,
+    metrics,
+    metrics_text,
+    response_cache,
+    llm_cache,
+    in_flight,
+    key_pool,
+    llm_timings,
+    recent_spans,
+    TRACE_SPANS,
+)
+
+st.set_page_config(page_title="Diagnostics", page_icon="🩺", layout="wide")
+
+token = get_setting("DIAGNOSTICS_TOKEN")
+if not token or st.query_params.get("token") != token:
+    st.error("Diagnostics are only available with DIAGNOSTICS_TOKEN set and a matching ?token= in the URL.")
+    st.stop()
+
+st.title("Diagnostics")
+
+if st.button("Refresh"):
+    st.rerun()
+
+st.header("Latency")
+rows = [
+    {
+        "Metric": row["name"],
+        **row["labels"],
+        "Calls": row["count"],
+        "Mean ms": row["mean"] * 1000,
+        "p50 ms": row["p50"] * 1000,
+        "p95 ms": row["p95"] * 1000,
+        "p99 ms": row["p99"] * 1000,
+    }
+    for row in sorted(metrics.summary(), key=lambda r: (r["name"], sorted(r["labels"].items())))
+]
+if rows:
+    st.dataframe(rows, use_container_width=True, hide_index=True)
+else:
+    st.info("No calls recorded yet.")
+
+st.header("Counters")
+counters = [{"Counter": name, **labels, "Value": value} for name, labels, value in metrics.counter_values()]
+if counters:
+    st.dataframe(counters, use_container_width=True, hide_index=True)
+
+col1, col2, col3 = st.columns(3)
+
+with col1:
+    st.subheader("Response Cache")
+    stats = response_cache.stats()
+    st.metric("Hit Rate", f"{stats['hit_rate'] * 100:.1f}%")
+    st.json(stats)
+
+with col2:
+    st.subheader("LLM Cache")
+    stats = llm_cache.stats()
+    st.metric("Hit Rate", f"{stats['hit_rate'] * 100:.1f}%")
+    st.json(stats)
+
+with col3:
+    st.subheader("Coalescing")
+    stats = in_flight.stats()
+    st.metric("Coalesced Calls", stats["coalesced"])
+    st.json(stats)
+
+st.header("API Keys")
+st.dataframe(key_pool.stats(), use_container_width=True, hide_index=True)
+
+st.header("Recent LLM Calls")
+if llm_timings:
+    st.dataframe(list(llm_timings)[-50:][::-1], use_container_width=True, hide_index=True)
+
+st.header("Trace Spans")
+if TRACE_SPANS:
+    st.dataframe(list(recent_spans)[-200:][::-1], use_container_width=True, hide_index=True)
+else:
+    st.caption("Set TRACE_SPANS=1 to record per-request spans.")
+
+with st.expander("Prometheus Metrics"):
+    st.code(metrics_text(), language="text")
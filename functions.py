@@ -1,90 +1,2079 @@
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import os
+import re
+import csv
+import difflib
+import functools
+from pathlib import Path
+import json
+import hashlib
+import time
+import random
+import asyncio
+import sqlite3
+import threading
+from collections import OrderedDict, deque
+from operator import itemgetter
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 
 
 REQUEST_TIMEOUT = 3  
 
-API_KEYS = st.secrets["API_KEYS"]
-current_key_index = 0
+def get_setting(name, default=None):
+    if name in os.environ:
+        return os.environ[name]
+    try:
+        return st.secrets.get(name, default)
+    except Exception:
+        return default
 
-def reset_key_index():
-    global current_key_index
-    current_key_index = 0
 
-def get_current_key():
-    return API_KEYS[current_key_index]
+# a list in secrets.toml, or a comma separated API_KEYS env var for scripts
+API_KEYS = get_setting("API_KEYS", [])
+if isinstance(API_KEYS, str):
+    API_KEYS = [key.strip() for key in API_KEYS.split(",") if key.strip()]
 
-def rotate_key():
-    global current_key_index
-    current_key_index = (current_key_index + 1) % len(API_KEYS)
-    return True
 
+METRIC_SAMPLES = 1024
+TRACE_SPANS = str(get_setting("TRACE_SPANS", "")).lower() in ("1", "true", "yes")
+
+
+class Metrics:
+    def __init__(self, samples=METRIC_SAMPLES):
+        self.samples = samples
+        self.timings = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            series = self.timings.get(key)
+            if series is None:
+                series = self.timings[key] = [deque(maxlen=self.samples), 0, 0.0]
+            series[0].append(seconds)
+            series[1] += 1
+            series[2] += seconds
+
+    def incr(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def summary(self):
+        rows = []
+        with self.lock:
+            items = [(key, sorted(series[0]), series[1], series[2]) for key, series in self.timings.items()]
+        for (name, labels), samples, count, total in items:
+            rows.append({
+                "name": name,
+                "labels": dict(labels),
+                "count": count,
+                "mean": total / count if count else 0.0,
+                "p50": percentile(samples, 0.50),
+                "p95": percentile(samples, 0.95),
+                "p99": percentile(samples, 0.99),
+            })
+        return rows
+
+    def counter_values(self):
+        with self.lock:
+            return [(name, dict(labels), value) for (name, labels), value in self.counters.items()]
+
+
+def percentile(samples, q):
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+metrics = Metrics()
+recent_spans = deque(maxlen=500)
 
-def safe_api_call(func, symbol, period=None):
-    key = get_current_key()
 
+@contextmanager
+def timed(name, **labels):
+    start = time.perf_counter()
     try:
-        if period:
-            data, meta = func(symbol, key, period, timeout=REQUEST_TIMEOUT)
-            return data, meta
-        else:
-            data = func(symbol, key, timeout=REQUEST_TIMEOUT)
+        yield labels
+    except Exception as e:
+        labels.setdefault("outcome", type(e).__name__)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        labels.setdefault("outcome", "ok")
+        metrics.observe(name, elapsed, **labels)
+        if TRACE_SPANS:
+            recent_spans.append({
+                "name": name,
+                "labels": dict(labels),
+                "seconds": elapsed,
+                "thread": threading.current_thread().name,
+                "at": time.time(),
+            })
+
+
+# seconds each endpoint's response stays fresh
+CACHE_TTLS = {
+    ("get_stock_quote", None): 30,
+    ("get_bulk_quotes", None): 30,
+    ("get_company_overview", None): 6 * 60 * 60,
+    ("get_time_series_data", "Daily"): 60 * 60,
+    ("get_time_series_data", "Weekly"): 6 * 60 * 60,
+    ("get_time_series_data", "Monthly"): 24 * 60 * 60,
+    ("get_time_series_data", "1min"): 60,
+    ("get_time_series_data", "5min"): 2 * 60,
+    ("get_time_series_data", "15min"): 5 * 60,
+    ("get_time_series_data", "60min"): 5 * 60,
+}
+DEFAULT_CACHE_TTL = 60
+CACHE_MAX_BYTES = int(get_setting("CACHE_MAX_BYTES", 64 * 1024 * 1024))
+CACHE_DB_PATH = get_setting("CACHE_DB_PATH")
+# rows kept on disk per table, past that the soonest to expire go first
+CACHE_DB_MAX_ROWS = int(get_setting("CACHE_DB_MAX_ROWS", 50000))
+CACHE_DB_PRUNE_EVERY = 5 * 60
+# seconds a writer waits on a locked database, the ingest CLI runs several
+SQLITE_TIMEOUT = 30
+
+
+def cache_ttl(func_name, period=None):
+    return CACHE_TTLS.get((func_name, period), DEFAULT_CACHE_TTL)
+
+
+class ResponseCache:
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, db_path=None, table="responses", max_rows=CACHE_DB_MAX_ROWS):
+        self.max_bytes = max_bytes
+        self.max_rows = max_rows
+        self.table = table
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        self.db = None
+        self.pruned_at = 0.0
+        if db_path:
+            self.db = sqlite3.connect(db_path, timeout=SQLITE_TIMEOUT, check_same_thread=False)
+            self.db.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} "
+                "(key TEXT PRIMARY KEY, expires_at REAL, value TEXT)"
+            )
+            self.db.execute(f"CREATE INDEX IF NOT EXISTS {table}_expires_at ON {table} (expires_at)")
+            self.db.commit()
+
+    def get(self, key, record=True):
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] > now:
+                self.entries.move_to_end(key)
+                self.hits += record
+                return True, entry[2]
+            if entry:
+                self._drop(key)
+
+            if self.db is not None:
+                row = self.db.execute(
+                    f"SELECT expires_at, value FROM {self.table} WHERE key = ?",
+                    (json.dumps(key),)
+                ).fetchone()
+                if row and row[0] > now:
+                    value = json.loads(row[1])
+                    if isinstance(value, list):
+                        value = tuple(value)
+                    self._store(key, value, row[0], len(row[1]))
+                    self.hits += record
+                    return True, value
+                if row:
+                    self.db.execute(f"DELETE FROM {self.table} WHERE key = ?", (json.dumps(key),))
+                    self.db.commit()
+
+            self.misses += record
+            return False, None
+
+    def set(self, key, value, ttl):
+        text = json.dumps(value)
+        expires_at = time.time() + ttl
+        with self.lock:
+            self._store(key, value, expires_at, len(text))
+            if self.db is not None:
+                self.db.execute(
+                    f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?)",
+                    (json.dumps(key), expires_at, text)
+                )
+                self._prune_db()
+                self.db.commit()
+
+    def set_many(self, items):
+        # [(key, value, ttl)], written to disk in one transaction
+        rows = []
+        now = time.time()
+        with self.lock:
+            for key, value, ttl in items:
+                text = json.dumps(value)
+                self._store(key, value, now + ttl, len(text))
+                rows.append((json.dumps(key), now + ttl, text))
+            if self.db is not None and rows:
+                with self.db:
+                    self.db.executemany(f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?)", rows)
+                    self._prune_db()
+
+    def expires_in(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            return entry[0] - time.time()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+            if self.db is not None:
+                self.db.execute(f"DELETE FROM {self.table}")
+                self.db.commit()
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def _store(self, key, value, expires_at, size):
+        if key in self.entries:
+            self._drop(key)
+        if size > self.max_bytes:
+            return
+        self.entries[key] = (expires_at, size, value)
+        self.size += size
+        while self.size > self.max_bytes:
+            oldest = next(iter(self.entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def _drop(self, key):
+        entry = self.entries.pop(key)
+        self.size -= entry[1]
+
+    def _prune_db(self):
+        # runs inside the caller's transaction, at most every CACHE_DB_PRUNE_EVERY seconds
+        now = time.time()
+        if now - self.pruned_at < CACHE_DB_PRUNE_EVERY:
+            return
+        self.pruned_at = now
+        self.db.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (now,))
+        self.db.execute(
+            f"DELETE FROM {self.table} WHERE key IN "
+            f"(SELECT key FROM {self.table} ORDER BY expires_at LIMIT max((SELECT count(*) FROM {self.table}) - ?, 0))",
+            (self.max_rows,)
+        )
+
+
+response_cache = ResponseCache(db_path=CACHE_DB_PATH)
+
+# Alpha Vantage free tier budgets, per key
+KEY_CALLS_PER_MINUTE = int(get_setting("KEY_CALLS_PER_MINUTE", 5))
+KEY_CALLS_PER_DAY = int(get_setting("KEY_CALLS_PER_DAY", 25))
+KEY_COOLDOWN = int(get_setting("KEY_COOLDOWN", 60))
+
+
+class KeyState:
+    def __init__(self, key, per_minute):
+        self.key = key
+        self.tokens = float(per_minute)
+        self.refilled_at = time.time()
+        self.cooldown_until = 0.0
+        self.throttled_at = 0.0
+        self.day = time.strftime("%Y-%m-%d")
+        self.day_calls = 0
+        self.calls = 0
+        self.throttles = 0
+        self.disabled = False
+
+
+class KeyPool:
+    def __init__(self, keys, per_minute=KEY_CALLS_PER_MINUTE, per_day=KEY_CALLS_PER_DAY, cooldown=KEY_COOLDOWN):
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self.cooldown = cooldown
+        self.states = [KeyState(k, per_minute) for k in keys]
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        now = time.time()
+        with self.lock:
+            healthy = [s for s in self.states if self._available(s, now)]
+            if not healthy:
+                return None
+            state = min(healthy, key=lambda s: (s.throttled_at, -s.tokens))
+            state.tokens -= 1
+            state.day_calls += 1
+            state.calls += 1
+            return state.key
+
+    def throttle(self, key, cooldown=None):
+        now = time.time()
+        with self.lock:
+            for state in self.states:
+                if state.key == key:
+                    state.cooldown_until = now + (cooldown or self.cooldown)
+                    state.throttled_at = now
+                    state.tokens = 0.0
+                    state.throttles += 1
+
+    def disable(self, key):
+        # rejected by Alpha Vantage, no point waiting for it to cool down
+        with self.lock:
+            for state in self.states:
+                if state.key == key:
+                    state.disabled = True
+
+    def spare_tokens(self):
+        now = time.time()
+        with self.lock:
+            return sum(state.tokens for state in self.states if self._available(state, now))
+
+    def spare_day_calls(self):
+        now = time.time()
+        with self.lock:
+            for state in self.states:
+                self._refill(state, now)
+            return sum(max(self.per_day - state.day_calls, 0) for state in self.states if not state.disabled)
+
+    def day_capacity(self):
+        return self.per_day * sum(not state.disabled for state in self.states)
+
+    def wait_time(self):
+        now = time.time()
+        with self.lock:
+            waits = []
+            for state in self.states:
+                self._refill(state, now)
+                if state.disabled or state.day_calls >= self.per_day:
+                    continue
+                wait = max(state.cooldown_until - now, 0.0)
+                if state.tokens < 1:
+                    wait = max(wait, (1 - state.tokens) * 60.0 / self.per_minute)
+                waits.append(wait)
+            return min(waits) if waits else None
+
+    def stats(self):
+        now = time.time()
+        with self.lock:
+            return [
+                {
+                    "key": state.key[-4:],
+                    "calls": state.calls,
+                    "day_calls": state.day_calls,
+                    "tokens": round(state.tokens, 2),
+                    "throttles": state.throttles,
+                    "cooling": state.cooldown_until > now,
+                    "disabled": state.disabled,
+                }
+                for state in self.states
+            ]
+
+    def _available(self, state, now):
+        self._refill(state, now)
+        return (
+            not state.disabled
+            and state.cooldown_until <= now
+            and state.tokens >= 1
+            and state.day_calls < self.per_day
+        )
+
+    def _refill(self, state, now):
+        today = time.strftime("%Y-%m-%d")
+        if state.day != today:
+            state.day = today
+            state.day_calls = 0
+        elapsed = now - state.refilled_at
+        state.tokens = min(float(self.per_minute), state.tokens + elapsed * self.per_minute / 60.0)
+        state.refilled_at = now
+
+
+key_pool = KeyPool(API_KEYS)
+
+
+ALPHA_VANTAGE_URL = get_setting("ALPHA_VANTAGE_URL", "https://www.alphavantage.co/query")
+HTTP_POOL_SIZE = int(get_setting("HTTP_POOL_SIZE", 20))
+HTTP_RETRIES = int(get_setting("HTTP_RETRIES", 2))
+
+
+def build_http_session(pool_size=HTTP_POOL_SIZE, retries=HTTP_RETRIES):
+    # only retry connections that never reached the server; a resend after a
+    # read timeout or error status would spend the same key behind KeyPool's
+    # back, call_with_retries handles those on another key
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=0,
+        status=0,
+        other=0,
+        backoff_factor=0.2,
+        allowed_methods=["GET"],
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "Accept-Encoding": "gzip, deflate",
+        "Connection": "keep-alive",
+    })
+    return session
+
+
+http_session = build_http_session()
+
+
+FETCH_WORKERS = int(get_setting("FETCH_WORKERS", 16))
+BUNDLE_TIMEOUT = float(get_setting("BUNDLE_TIMEOUT", 10))
+BULK_QUOTE_CHUNK = 100
+BULK_RETRY_AFTER = 60 * 60
+bulk_quotes_state = {"disabled_until": 0.0}
+ASYNC_CONCURRENCY = int(get_setting("ASYNC_CONCURRENCY", len(API_KEYS) * KEY_CALLS_PER_MINUTE))
+
+
+MAX_API_ATTEMPTS = int(get_setting("MAX_API_ATTEMPTS", len(API_KEYS) + 2))
+MAX_KEY_WAIT = float(get_setting("MAX_KEY_WAIT", 2))
+BACKOFF_BASE = 0.25
+BACKOFF_CAP = 2.0
+
+RESPONSE_OK = "ok"
+RESPONSE_THROTTLED = "throttled"
+RESPONSE_INVALID = "invalid"
+RESPONSE_ERROR = "error"
+RESPONSE_UNSUPPORTED = "unsupported"
+RESPONSE_BAD_KEY = "bad_key"
+
+
+class RateLimitError(Exception):
+    pass
+
+
+class TransientAPIError(Exception):
+    pass
+
+
+class UnsupportedEndpointError(Exception):
+    pass
+
+
+class InvalidKeyError(Exception):
+    pass
+
+
+def is_rate_limited(data):
+    if not isinstance(data, dict):
+        return False
+    message = data.get("Note") or data.get("Information") or ""
+    return "frequency" in message or "rate limit" in message.lower()
+
+
+def classify_response(data, expected_key):
+    if not isinstance(data, dict):
+        return RESPONSE_ERROR
+    if is_rate_limited(data):
+        return RESPONSE_THROTTLED
+    if "premium" in (data.get("Information") or "").lower():
+        return RESPONSE_UNSUPPORTED
+    if data.get(expected_key):
+        return RESPONSE_OK
+    if "apikey" in str(data.get("Error Message", "")).lower():
+        # "the parameter apikey is invalid or missing", says nothing about the symbol
+        return RESPONSE_BAD_KEY
+    if "Error Message" in data or not data or expected_key in data:
+        return RESPONSE_INVALID
+    return RESPONSE_ERROR
+
+
+def backoff_delay(attempt):
+    delay = min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt)
+    return random.uniform(0, delay)
+
+
+class SingleFlight:
+    def __init__(self):
+        self.calls = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self.lock:
+            future = self.calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self.calls[key] = future
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                self.calls.pop(key, None)
+
+    def record(self, leader):
+        # for callers that coalesce on their own, like the asyncio tasks
+        with self.lock:
+            if leader:
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                "in_flight": len(self.calls),
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+            }
+
+
+in_flight = SingleFlight()
+
+
+# name -> callables run with (symbol, data) after a successful fetch
+RESULT_HOOKS = {}
+
+
+def run_result_hooks(name, symbol, data):
+    for hook in RESULT_HOOKS.get(name, ()):
+        try:
+            hook(symbol, data)
+        except Exception as e:
+            print("Result hook error:", e)
+
+
+class Popularity:
+    def __init__(self):
+        self.scores = {}
+        self.seen = {}
+        self.lock = threading.Lock()
+
+    def record(self, key):
+        with self.lock:
+            self.scores[key] = self.scores.get(key, 0.0) + 1.0
+            self.seen[key] = time.time()
+
+    def top(self, n, min_score=0.0):
+        with self.lock:
+            keys = [k for k, v in self.scores.items() if v >= min_score]
+            return sorted(keys, key=self.scores.get, reverse=True)[:n]
+
+    def last_seen(self, key):
+        with self.lock:
+            return self.seen.get(key, 0.0)
+
+    def decay(self, factor):
+        with self.lock:
+            self.scores = {k: v * factor for k, v in self.scores.items() if v * factor >= 0.05}
+            self.seen = {k: v for k, v in self.seen.items() if k in self.scores}
 
-          
-            if isinstance(data, dict) and "Note" in data:
-                if "frequency" in data["Note"] or "rate limit" in data["Note"].lower():
-                    rotate_key()
-                    return None
 
-            return data
+popularity = Popularity()
 
-    except requests.exceptions.Timeout:
+
+def safe_api_call(func, symbol, period=None):
+    cache_key = (func.__name__, symbol, period)
+    popularity.record(cache_key)
+    with timed("api_call_seconds", endpoint=func.__name__) as labels:
+        hit, cached = response_cache.get(cache_key)
+        if hit:
+            labels["cache"] = "hit"
+            return cached
+
+        labels["cache"] = "miss"
+        result = in_flight.do(cache_key, lambda: call_with_retries(func, symbol, period))
+        if not (result[0] if period else result):
+            labels["outcome"] = "empty"
+        return result
+
+
+def call_with_retries(func, symbol, period=None, refresh=False):
+    cache_key = (func.__name__, symbol, period)
+    if not refresh:
+        hit, cached = response_cache.get(cache_key, record=False)
+        if hit:
+            return cached
+
+    empty = (None, None) if period else None
+    args = (period,) if period else ()
+
+    for attempt in range(MAX_API_ATTEMPTS):
+        key, delay = acquire_key()
+        if key is None:
+            if delay is None:
+                return empty
+            time.sleep(delay)
+            continue
+
+        try:
+            result = func(symbol, key, *args, timeout=REQUEST_TIMEOUT)
+        except API_ERRORS as e:
+            delay = retry_delay(e, key, attempt)
+            if delay is None:
+                return empty
+            time.sleep(delay)
+            continue
+
+        store_result(func.__name__, symbol, period, result)
+        return result
+
+    return empty
+
+
+# the retry steps below are shared by call_with_retries and async_call_with_retries
+API_ERRORS = (RateLimitError, TransientAPIError, UnsupportedEndpointError, InvalidKeyError)
+
+
+def acquire_key():
+    # (key, 0) to call with, (None, seconds) to wait before trying again, (None, None) to give up
+    key = key_pool.acquire()
+    if key is not None:
+        return key, 0
+    wait = key_pool.wait_time()
+    if wait is None or wait > MAX_KEY_WAIT:
+        return None, None
+    return None, wait + backoff_delay(0)
+
+
+def retry_delay(error, key, attempt):
+    # seconds before the next attempt after a failed call, None when another key will not help
+    if isinstance(error, RateLimitError):
+        key_pool.throttle(key)
+        return backoff_delay(0)
+    if isinstance(error, InvalidKeyError):
+        print(f"API key ...{key[-4:]} rejected, leaving it out:", error)
+        key_pool.disable(key)
+        return 0
+    print("API error:", error)
+    if isinstance(error, UnsupportedEndpointError):
         return None
+    return backoff_delay(attempt)
 
-    except Exception as e:
-        print("API error:", e)
+
+def store_result(name, symbol, period, result):
+    data = result[0] if period else result
+    if data:
+        response_cache.set((name, symbol, period), result, cache_ttl(name, period))
+        run_result_hooks(name, symbol, data)
+
+
+def parse_alpha_vantage(data, params, expected_key):
+    status = classify_response(data, expected_key)
+    if status == RESPONSE_THROTTLED:
+        raise RateLimitError(data.get("Note") or data.get("Information"))
+    if status == RESPONSE_ERROR:
+        raise TransientAPIError(f"{params.get('function')} {params.get('symbol')}: unexpected reply {str(data)[:200]}")
+    if status == RESPONSE_UNSUPPORTED:
+        raise UnsupportedEndpointError(f"{params.get('function')}: {data['Information']}")
+    if status == RESPONSE_BAD_KEY:
+        raise InvalidKeyError(data["Error Message"])
+    if status == RESPONSE_INVALID:
         return None
+    return data
+
+
+def fetch_alpha_vantage(params, api_key, expected_key, timeout=3):
+    metrics.incr("alphavantage_key_calls_total", key=api_key[-4:])
+    with timed("alphavantage_request_seconds", function=params.get("function")):
+        try:
+            response = http_session.get(
+                ALPHA_VANTAGE_URL,
+                params={**params, "apikey": api_key},
+                timeout=timeout
+            )
+            if response.status_code == 429:
+                raise RateLimitError(f"{params.get('function')}: HTTP 429")
+            data = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            raise TransientAPIError(f"{params.get('function')} {params.get('symbol')}: {e}") from e
+
+        return parse_alpha_vantage(data, params, expected_key)
+
+
+TIME_SERIES_FUNCTIONS = {
+    "Daily": ("TIME_SERIES_DAILY", "Time Series (Daily)"),
+    "Weekly": ("TIME_SERIES_WEEKLY", "Weekly Time Series"),
+    "Monthly": ("TIME_SERIES_MONTHLY", "Monthly Time Series"),
+}
+
+
+INTRADAY_INTERVALS = ("1min", "5min", "15min", "60min")
+
+
+def time_series_function(period):
+    if period in INTRADAY_INTERVALS:
+        return "TIME_SERIES_INTRADAY", f"Time Series ({period})"
+    return TIME_SERIES_FUNCTIONS.get(period, TIME_SERIES_FUNCTIONS["Monthly"])
 
 
 def get_stock_quote(symbol, api_key, timeout=3):
-    url = f"https://www.alphavantage.co/query?function=GLOBAL_QUOTE&symbol={symbol}&apikey={api_key}"
+    data = fetch_alpha_vantage({"function": "GLOBAL_QUOTE", "symbol": symbol}, api_key, "Global Quote", timeout)
+    if data:
+        return data["Global Quote"]
+    return None
+
+def get_company_overview(symbol, api_key, timeout=3):
+    return fetch_alpha_vantage({"function": "OVERVIEW", "symbol": symbol}, api_key, "Symbol", timeout)
+
+def get_time_series_data(symbol, api_key, period, timeout=3, outputsize="compact"):
+    function, key = time_series_function(period)
+    params = {"function": function, "symbol": symbol, "outputsize": outputsize}
+    if period in INTRADAY_INTERVALS:
+        params["interval"] = period
+    data = fetch_alpha_vantage(params, api_key, key, timeout)
+    if data:
+        return data[key], key
+    return None, None
+
+# periods whose outputsize=full replied "premium", and until when to believe it
+FULL_SERIES_RETRY_AFTER = 24 * 60 * 60
+full_series_state = {}
+
+
+def full_series_supported(period):
+    return time.time() >= full_series_state.get(period, 0.0)
+
+
+def get_full_time_series_data(symbol, api_key, period, timeout=10):
     try:
-        response = requests.get(url, timeout=timeout)
-        data = response.json()
-        if "Global Quote" in data and data["Global Quote"]:
-            return data["Global Quote"]
+        return get_time_series_data(symbol, api_key, period, timeout=max(timeout, 10), outputsize="full")
+    except UnsupportedEndpointError:
+        # premium-only on free keys, seed from the compact window for a while
+        full_series_state[period] = time.time() + FULL_SERIES_RETRY_AFTER
+        raise
+
+
+HISTORY_DB_PATH = get_setting("HISTORY_DB_PATH", "price_history.db")
+OHLCV_FIELDS = ("open", "high", "low", "close", "volume")
+
+
+class HistoryStore:
+    def __init__(self, db_path=HISTORY_DB_PATH):
+        self.db = sqlite3.connect(db_path, timeout=SQLITE_TIMEOUT, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock:
+            self.db.executescript("""
+                PRAGMA journal_mode = WAL;
+                CREATE TABLE IF NOT EXISTS bars (
+                    symbol TEXT, period TEXT, date TEXT,
+                    open REAL, high REAL, low REAL, close REAL, volume INTEGER,
+                    PRIMARY KEY (symbol, period, date)
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS history_state (
+                    symbol TEXT, period TEXT, last_date TEXT, updated_at REAL,
+                    PRIMARY KEY (symbol, period)
+                );
+            """)
+            self.db.commit()
+
+    def state(self, symbol, period):
+        with self.lock:
+            return self.db.execute(
+                "SELECT last_date, updated_at FROM history_state WHERE symbol = ? AND period = ?",
+                (symbol, period)
+            ).fetchone()
+
+    def merge(self, symbol, period, series):
+        self.merge_many([(symbol, period, series)])
+
+    def merge_many(self, items):
+        # [(symbol, period, series)], all in one transaction
+        rows = [
+            (
+                symbol, period, date,
+                float(bar["1. open"]), float(bar["2. high"]), float(bar["3. low"]),
+                float(bar["4. close"]), int(float(bar["5. volume"]))
+            )
+            for symbol, period, series in items
+            for date, bar in series.items()
+        ]
+        if not rows:
+            return
+        with self.lock:
+            with self.db:
+                self.db.executemany("INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                for symbol, period, series in items:
+                    if not series:
+                        continue
+                    last_date = self.db.execute(
+                        "SELECT MAX(date) FROM bars WHERE symbol = ? AND period = ?", (symbol, period)
+                    ).fetchone()[0]
+                    self.db.execute(
+                        "INSERT OR REPLACE INTO history_state VALUES (?, ?, ?, ?)",
+                        (symbol, period, last_date, time.time())
+                    )
+
+    def touch(self, symbol, period):
+        with self.lock:
+            with self.db:
+                self.db.execute(
+                    "UPDATE history_state SET updated_at = ? WHERE symbol = ? AND period = ?",
+                    (time.time(), symbol, period)
+                )
+
+    def load(self, symbol, period, start=None):
+        query = "SELECT date, open, high, low, close, volume FROM bars WHERE symbol = ? AND period = ?"
+        args = [symbol, period]
+        if start:
+            query += " AND date >= ?"
+            args.append(start)
+        with self.lock:
+            rows = self.db.execute(query + " ORDER BY date", args).fetchall()
+        if not rows:
+            return None
+        columns = dict(zip(("date",) + OHLCV_FIELDS, map(list, zip(*rows))))
+        return columns
+
+
+@functools.lru_cache(maxsize=None)
+def get_history_store():
+    return HistoryStore()
+
+
+def fetch_seed_series(symbol, period, call=safe_api_call):
+    # the longest series the keys can get to seed a store with
+    series = None
+    if full_series_supported(period):
+        series, _ = call(get_full_time_series_data, symbol, period)
+    if not series:
+        # full daily history is a premium endpoint on free keys
+        series, _ = call(get_time_series_data, symbol, period)
+    return series
+
+
+def get_price_history(symbol, period="Daily", start=None):
+    history_store = get_history_store()
+    state = history_store.state(symbol, period)
+
+    if state is None:
+        series = fetch_seed_series(symbol, period)
+        if not series:
+            return None
+        history_store.merge(symbol, period, series)
+
+    elif time.time() - state[1] > cache_ttl("get_time_series_data", period):
+        series, _ = safe_api_call(get_time_series_data, symbol, period)
+        if series and min(series) > state[0] and full_series_supported(period):
+            # compact window no longer overlaps what we hold, backfill the gap
+            full, _ = safe_api_call(get_full_time_series_data, symbol, period)
+            series = full or series
+        if series:
+            history_store.merge(symbol, period, series)
+        else:
+            history_store.touch(symbol, period)
+
+    return history_store.load(symbol, period, start)
+
+
+def history_calls_needed(symbol, period="Daily"):
+    # API calls get_price_history would spend right now, leaving out the rare gap backfill
+    state = get_history_store().state(symbol, period)
+    if state is None:
+        return 2 if full_series_supported(period) else 1
+    return int(time.time() - state[1] > cache_ttl("get_time_series_data", period))
+
+
+OHLCV_FRAME_CACHE_SIZE = 32
+ohlcv_frames = OrderedDict()
+ohlcv_frames_lock = threading.Lock()
+
+
+def to_ohlcv_frame(data, symbol=None, period=None):
+    import numpy as np
+    import pandas as pd
+
+    if not data:
         return None
-    except:
+
+    cache_key = None
+    if symbol:
+        if "date" in data:
+            last_bar = (data["date"][-1], data["close"][-1], len(data["date"]))
+        else:
+            last = max(data)
+            last_bar = (last, data[last]["4. close"], len(data))
+        cache_key = (symbol, period, last_bar)
+        with ohlcv_frames_lock:
+            frame = ohlcv_frames.get(cache_key)
+            if frame is not None:
+                ohlcv_frames.move_to_end(cache_key)
+                return frame
+
+    if "date" in data:
+        # columns from the history store, already sorted and typed
+        dates = np.array(data["date"], dtype="datetime64[ns]")
+        count = len(dates)
+        columns = {field: data[field] for field in OHLCV_FIELDS}
+    else:
+        # raw Alpha Vantage payload: {date: {"1. open": "...", ...}}
+        dates = np.array(list(data), dtype="datetime64[ns]")
+        count = len(dates)
+        fields = itemgetter(*(f"{i}. {field}" for i, field in enumerate(OHLCV_FIELDS, start=1)))
+        columns = dict(zip(OHLCV_FIELDS, zip(*map(fields, data.values()))))
+
+    arrays = {}
+    for field, values in columns.items():
+        if field == "volume":
+            arrays[field] = np.fromiter(map(int, values), np.int64, count)
+        else:
+            arrays[field] = np.fromiter(map(float, values), np.float32, count)
+
+    frame = pd.DataFrame(arrays, index=pd.DatetimeIndex(dates, name="date"), copy=False)
+    if not frame.index.is_monotonic_increasing:
+        frame = frame.sort_index()
+
+    if cache_key:
+        with ohlcv_frames_lock:
+            ohlcv_frames[cache_key] = frame
+            while len(ohlcv_frames) > OHLCV_FRAME_CACHE_SIZE:
+                ohlcv_frames.popitem(last=False)
+    return frame
+
+
+CHART_PIXEL_WIDTH = 1200
+# a candle needs a few pixels to stay readable
+CHART_PIXELS_PER_BAR = 3
+
+
+def downsample_ohlcv(frame, max_points=CHART_PIXEL_WIDTH // CHART_PIXELS_PER_BAR):
+    import numpy as np
+    import pandas as pd
+
+    if frame is None or len(frame) <= max_points:
+        return frame
+
+    size = -(-len(frame) // max_points)
+    starts = np.arange(0, len(frame), size)
+    ends = np.append(starts[1:], len(frame)) - 1
+
+    return pd.DataFrame(
+        {
+            "open": frame["open"].to_numpy()[starts],
+            "high": np.maximum.reduceat(frame["high"].to_numpy(), starts),
+            "low": np.minimum.reduceat(frame["low"].to_numpy(), starts),
+            "close": frame["close"].to_numpy()[ends],
+            "volume": np.add.reduceat(frame["volume"].to_numpy(), starts),
+        },
+        index=frame.index[starts],
+    )
+
+
+INTRADAY_MAX_BARS = 2000
+# trim in steps so the indicator cache can stay incremental between trims
+INTRADAY_TRIM_STEP = 250
+INTRADAY_FEEDS = 64
+
+
+class IntradayFeed:
+    def __init__(self, symbol, interval):
+        self.symbol = symbol
+        self.interval = interval
+        self.frame = None
+        self.last_date = None
+        self.polled_at = 0.0
+        self.lock = threading.Lock()
+
+    def stale(self):
+        return time.time() - self.polled_at >= cache_ttl("get_time_series_data", self.interval)
+
+    def poll(self):
+        # every viewer calls this; the lock lets one of them fetch per
+        # interval while the rest wait for it and get the same frame
+        with self.lock:
+            if self.frame is not None and not self.stale():
+                return self.frame, 0
+            self.polled_at = time.time()
+            if self.frame is None:
+                return self._seed()
+            return self._append()
+
+    def _seed(self):
+        history = get_price_history(self.symbol, self.interval)
+        if not history:
+            return None, 0
+        self.last_date = history["date"][-1]
+        self.frame = self._trim(to_ohlcv_frame(history))
+        return self.frame, len(self.frame)
+
+    def _append(self):
+        import pandas as pd
+
+        series, _ = safe_api_call(get_time_series_data, self.symbol, self.interval)
+        # the newest held bar is re-read too, it is still forming
+        fresh = {date: bar for date, bar in (series or {}).items() if date >= self.last_date}
+        if not fresh:
+            return self.frame, 0
+        get_history_store().merge(self.symbol, self.interval, fresh)
+
+        delta = to_ohlcv_frame(fresh)
+        frame = pd.concat([self.frame[self.frame.index < delta.index[0]], delta])
+        added = len(frame) - len(self.frame)
+        self.last_date = max(fresh)
+        self.frame = self._trim(frame)
+        return self.frame, added
+
+    def _trim(self, frame):
+        if len(frame) > INTRADAY_MAX_BARS + INTRADAY_TRIM_STEP:
+            frame = frame.iloc[-INTRADAY_MAX_BARS:]
+        return frame
+
+
+intraday_feeds = OrderedDict()
+intraday_feeds_lock = threading.Lock()
+
+
+def get_intraday_feed(symbol, interval):
+    key = (symbol, interval)
+    with intraday_feeds_lock:
+        feed = intraday_feeds.get(key)
+        if feed is None:
+            feed = intraday_feeds[key] = IntradayFeed(symbol, interval)
+        intraday_feeds.move_to_end(key)
+        while len(intraday_feeds) > INTRADAY_FEEDS:
+            intraday_feeds.popitem(last=False)
+    return feed
+
+
+def get_bulk_quotes(symbols, api_key, timeout=3):
+    try:
+        data = fetch_alpha_vantage({"function": "REALTIME_BULK_QUOTES", "symbol": symbols}, api_key, "data", timeout)
+    except UnsupportedEndpointError:
+        # premium-only on free keys, use GLOBAL_QUOTE for a while
+        bulk_quotes_state["disabled_until"] = time.time() + BULK_RETRY_AFTER
+        raise
+    if data:
+        return [bulk_row_to_quote(row) for row in data["data"] if row.get("symbol")]
+    return None
+
+
+def bulk_row_to_quote(row):
+    change_percent = str(row.get("change_percent", "0"))
+    if not change_percent.endswith("%"):
+        change_percent += "%"
+    return {
+        "01. symbol": row["symbol"],
+        "02. open": row.get("open"),
+        "03. high": row.get("high"),
+        "04. low": row.get("low"),
+        "05. price": row.get("close"),
+        "06. volume": row.get("volume"),
+        "07. latest trading day": str(row.get("timestamp", ""))[:10],
+        "08. previous close": row.get("previous_close"),
+        "09. change": row.get("change"),
+        "10. change percent": change_percent,
+    }
+
+
+ENDPOINTS = {
+    "quote": get_stock_quote,
+    "overview": get_company_overview,
+    "series": get_time_series_data,
+    "history": get_price_history,
+}
+
+fetch_executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="av-fetch")
+
+
+def fetch_bundle(symbols, endpoints=("quote", "overview"), period="Daily", timeout=BUNDLE_TIMEOUT):
+    futures = {}
+    for symbol in symbols:
+        for endpoint in endpoints:
+            func = ENDPOINTS[endpoint]
+            if endpoint == "history":
+                future = fetch_executor.submit(func, symbol, period)
+            elif endpoint == "series":
+                future = fetch_executor.submit(safe_api_call, func, symbol, period)
+            else:
+                future = fetch_executor.submit(safe_api_call, func, symbol)
+            futures[future] = (symbol, endpoint)
+
+    wait(futures, timeout=timeout)
+
+    results = {symbol: {} for symbol in symbols}
+    failed = []
+    for future, (symbol, endpoint) in futures.items():
+        if not future.done():
+            failed.append((symbol, endpoint, "timeout"))
+            continue
+        try:
+            result = future.result()
+        except Exception as e:
+            failed.append((symbol, endpoint, str(e)))
+            continue
+        data = result[0] if endpoint == "series" else result
+        if data:
+            results[symbol][endpoint] = result
+        else:
+            failed.append((symbol, endpoint, "no data"))
+
+    return results, failed
+
+
+LISTINGS_PATH = Path(__file__).parent / "data" / "listings.csv"
+TICKER_PATTERN = re.compile(r"^[A-Z]{1,5}(?:[.-][A-Z]{1,2})?$")
+UPPERCASE_TOKEN = re.compile(r"(?<![\w$])\$?[A-Z]{1,5}(?:\.[A-Z])?(?!\w)")
+# uppercase words that show up in questions but are not tickers we should look up
+TICKER_STOPWORDS = {
+    "A", "I", "AI", "AM", "AN", "AND", "ARE", "AT", "BE", "BUY", "CEO", "CFO", "DO", "EPS",
+    "ETF", "FOR", "GDP", "HI", "HOW", "IF", "IN", "IPO", "IS", "IT", "ME", "MY", "NONE", "NO",
+    "OF", "OK", "ON", "OR", "PE", "SELL", "SO", "THE", "TO", "US", "USA", "USD", "VS", "WHAT",
+    "WHY", "YOY", "YTD",
+}
+# lowercase spellings of symbols that are also everyday words
+COMMON_WORDS = {
+    "arm", "cat", "coin", "cost", "dia", "dis", "hon", "hood", "low", "net", "now", "para",
+    "shop", "snow", "spot",
+}
+NAME_SUFFIXES = {
+    "inc", "incorporated", "corp", "corporation", "co", "company", "companies", "ltd",
+    "limited", "plc", "p.l.c", "n.v", "s.a", "the", "class", "a", "b", "c", "holdings",
+    "holding", "group",
+}
+FUZZY_CUTOFF = 0.85
+
+
+def name_tokens(text):
+    text = text.lower().replace("'", "").replace("-", " ")
+    return [token.strip(".") for token in re.findall(r"[a-z0-9&.]+", text) if token.strip(".")]
+
+
+class TickerResolver:
+    def __init__(self, path=LISTINGS_PATH):
+        self.symbols = {}
+        self.names = {}
+        self.trie = {}
+        self.fuzzy = {}
+
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                symbol = row["symbol"]
+                self.symbols[symbol] = row["name"]
+                core = [t for t in name_tokens(row["name"]) if t not in NAME_SUFFIXES]
+                self.names.setdefault(" ".join(core), symbol)
+
+                aliases = [a for a in (row.get("aliases") or "").split("|") if a]
+                if len(symbol) >= 3 and symbol.lower() not in COMMON_WORDS:
+                    aliases.append(symbol.lower())
+                for alias in aliases:
+                    tokens = name_tokens(alias)
+                    self._add(tokens, symbol)
+                    if len(tokens) == 1 and len(tokens[0]) >= 5:
+                        self.fuzzy.setdefault(tokens[0], symbol)
+
+        self.fuzzy_words = list(self.fuzzy)
+
+    def _add(self, tokens, symbol):
+        node = self.trie
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node.setdefault("$", symbol)
+
+    def _match(self, tokens, start):
+        node = self.trie
+        symbol, length = None, 0
+        for i in range(start, len(tokens)):
+            node = node.get(tokens[i])
+            if node is None:
+                break
+            if "$" in node:
+                symbol, length = node["$"], i - start + 1
+        return symbol, length
+
+    def resolve(self, text):
+        found = []
+        unsure = False
+
+        for match in UPPERCASE_TOKEN.finditer(text):
+            token = match.group()
+            symbol = token.lstrip("$")
+            explicit = token.startswith("$")
+            if symbol in self.symbols and (explicit or symbol not in TICKER_STOPWORDS):
+                found.append(symbol)
+            elif explicit and TICKER_PATTERN.match(symbol):
+                found.append(symbol)
+            elif len(symbol) >= 2 and symbol not in TICKER_STOPWORDS:
+                unsure = True
+
+        tokens = name_tokens(text)
+        i = 0
+        while i < len(tokens):
+            symbol, length = self._match(tokens, i)
+            if symbol:
+                found.append(symbol)
+                i += length
+                continue
+            token = tokens[i]
+            if len(token) >= 5 and token.isalpha():
+                close = difflib.get_close_matches(token, self.fuzzy_words, n=1, cutoff=FUZZY_CUTOFF)
+                if close:
+                    found.append(self.fuzzy[close[0]])
+            i += 1
+
+        tickers = list(dict.fromkeys(found))
+        return tickers, bool(tickers) and not unsure
+
+    def validate(self, raw):
+        raw = raw.strip().strip(".\"'`$ ").upper()
+        if not raw or raw == "NONE":
+            return None
+        if raw in self.symbols:
+            return raw
+
+        tokens = name_tokens(raw)
+        core = " ".join(t for t in tokens if t not in NAME_SUFFIXES)
+        if core in self.names:
+            return self.names[core]
+        symbol, length = self._match(tokens, 0)
+        if symbol and length == len(tokens):
+            return symbol
+
+        if TICKER_PATTERN.match(raw) and raw not in TICKER_STOPWORDS:
+            return raw
         return None
 
-def get_company_overview(symbol, api_key, timeout=3):
-    url = f"https://www.alphavantage.co/query?function=OVERVIEW&symbol={symbol}&apikey={api_key}"
+
+@functools.lru_cache(maxsize=None)
+def get_ticker_resolver():
+    return TickerResolver()
+
+
+def resolve_tickers(text):
+    return get_ticker_resolver().resolve(text)
+
+
+def parse_ticker_list(text):
+    resolver = get_ticker_resolver()
+    tickers = [resolver.validate(part) for part in re.split(r"[,\n]", text or "")]
+    return list(dict.fromkeys(t for t in tickers if t))
+
+
+QUOTE_FIELDS = (
+    ("05. price", "Price"),
+    ("02. open", "Open"),
+    ("03. high", "High"),
+    ("04. low", "Low"),
+    ("10. change percent", "Chg"),
+)
+COMPANY_FIELDS = (
+    ("MarketCapitalization", "MktCap"),
+    ("PERatio", "P/E"),
+    ("ForwardPE", "FwdP/E"),
+    ("EPS", "EPS"),
+    ("Beta", "Beta"),
+    ("DividendYield", "DivYld"),
+    ("52WeekHigh", "52wHi"),
+    ("52WeekLow", "52wLo"),
+    ("QuarterlyRevenueGrowthYOY", "RevYoY"),
+    ("QuarterlyEarningsGrowthYOY", "EarnYoY"),
+)
+MISSING_VALUES = {"", "None", "-", "0", "N/A"}
+SUMMARY_CACHE_SIZE = 256
+summary_cache = OrderedDict()
+summary_cache_lock = threading.Lock()
+
+
+def compact_number(value):
     try:
-        response = requests.get(url, timeout=timeout)
-        data = response.json()
-        if data and "Symbol" in data:
-            return data
+        number = float(value)
+    except (TypeError, ValueError):
+        return str(value)
+    for divisor, suffix in ((1e12, "T"), (1e9, "B"), (1e6, "M")):
+        if abs(number) >= divisor:
+            return f"{number / divisor:.2f}{suffix}"
+    return f"{number:.6g}"
+
+
+class Stock:
+    __slots__ = ("symbol", "quote_data", "company_data", "domain")
+
+    def __init__(self, symbol, quote_data, company_data):
+        self.symbol = symbol
+        self.quote_data = quote_data or {}
+        self.company_data = company_data or {}
+        self.domain = (
+            self.company_data.get("OfficialSite", "")
+            .replace("https://", "")
+            .replace("http://", "")
+            .replace("www.", "")
+            .split("/")[0]
+        )
+
+    def version(self):
+        return (
+            self.quote_data.get("07. latest trading day"),
+            self.quote_data.get("05. price"),
+            self.company_data.get("LatestQuarter"),
+            self.company_data.get("MarketCapitalization"),
+        )
+
+    def summary(self):
+        key = (self.symbol, self.version())
+        with summary_cache_lock:
+            text = summary_cache.get(key)
+            if text is not None:
+                summary_cache.move_to_end(key)
+                return text
+
+        text = self._encode()
+        with summary_cache_lock:
+            summary_cache[key] = text
+            while len(summary_cache) > SUMMARY_CACHE_SIZE:
+                summary_cache.popitem(last=False)
+        return text
+
+    def _encode(self):
+        company = self.company_data
+        header = self.symbol
+        if company.get("Name"):
+            header += f" {company['Name']}"
+        sector = ", ".join(company[k] for k in ("Sector", "Industry") if company.get(k) not in (None, "None", ""))
+        if sector:
+            header += f" ({sector})"
+
+        parts = []
+        for key, label in QUOTE_FIELDS:
+            value = self.quote_data.get(key)
+            if value not in MISSING_VALUES and value is not None:
+                parts.append(f"{label} {value if key.startswith('10') else compact_number(value)}")
+        for key, label in COMPANY_FIELDS:
+            value = company.get(key)
+            if value not in MISSING_VALUES and value is not None:
+                parts.append(f"{label} {compact_number(value)}")
+
+        return header + "\n" + " | ".join(parts) + "\n"
+
+
+GEMINI_MODEL = get_setting("GEMINI_MODEL", "models/gemini-2.0-flash")
+
+
+@st.cache_resource
+def get_gemini_model(name=GEMINI_MODEL):
+    import google.generativeai as genai
+
+    genai.configure(api_key=get_setting("GOOGLE_API_KEY"))
+    return genai.GenerativeModel(name)
+
+
+LLM_CACHE_TTL = int(get_setting("LLM_CACHE_TTL", 15 * 60))
+llm_cache = ResponseCache(max_bytes=16 * 1024 * 1024, db_path=CACHE_DB_PATH, table="llm_responses")
+llm_timings = deque(maxlen=500)
+
+
+def prompt_hash(model, prompt, generation_config=None):
+    normalized = " ".join(prompt.split())
+    model_name = getattr(model, "model_name", type(model).__name__)
+    payload = json.dumps([model_name, normalized, generation_config], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def record_llm_call(label, ttft, total, chunks, cached=False, outcome="ok", usage=None):
+    llm_timings.append({
+        "label": label,
+        "ttft": ttft,
+        "total": total,
+        "chunks": chunks,
+        "cached": cached,
+        "outcome": outcome,
+        "at": time.time(),
+    })
+    labels = {"label": label, "cached": str(cached).lower(), "outcome": outcome}
+    metrics.observe("llm_seconds", total, **labels)
+    if ttft is not None:
+        metrics.observe("llm_ttft_seconds", ttft, **labels)
+    if usage is not None:
+        metrics.incr("llm_prompt_tokens_total", getattr(usage, "prompt_token_count", 0) or 0, label=label)
+        metrics.incr("llm_output_tokens_total", getattr(usage, "candidates_token_count", 0) or 0, label=label)
+
+
+def generate(model, prompt, generation_config=None, label="gemini"):
+    start = time.perf_counter()
+    outcome = "ok"
+    response = None
+    try:
+        response = model.generate_content(prompt, generation_config=generation_config)
+        return response
+    except Exception as e:
+        outcome = type(e).__name__
+        raise
+    finally:
+        total = time.perf_counter() - start
+        record_llm_call(label, total, total, 1, outcome=outcome, usage=getattr(response, "usage_metadata", None))
+
+
+def stream_generate(model, prompt, generation_config=None, label="gemini", cached=False):
+    start = time.perf_counter()
+    first_token = None
+    chunks = 0
+    cache_key = ("llm", prompt_hash(model, prompt, generation_config)) if cached else None
+
+    if cache_key:
+        hit, text = llm_cache.get(cache_key)
+        if hit:
+            elapsed = time.perf_counter() - start
+            record_llm_call(label, elapsed, elapsed, 1, cached=True)
+            yield text
+            return
+
+    parts = []
+    complete = False
+    outcome = "ok"
+    usage = None
+    try:
+        response = model.generate_content(prompt, generation_config=generation_config, stream=True)
+        for chunk in response:
+            usage = getattr(chunk, "usage_metadata", None) or usage
+            try:
+                text = chunk.text
+            except ValueError:
+                # blocked or empty candidate, nothing to show for this chunk
+                continue
+            if not text:
+                continue
+            if first_token is None:
+                first_token = time.perf_counter() - start
+            chunks += 1
+            parts.append(text)
+            yield text
+        complete = True
+    except Exception as e:
+        outcome = type(e).__name__
+        raise
+    finally:
+        if not complete and outcome == "ok":
+            outcome = "abandoned"
+        record_llm_call(label, first_token, time.perf_counter() - start, chunks, outcome=outcome, usage=usage)
+        if cache_key and complete and parts:
+            llm_cache.set(cache_key, "".join(parts), LLM_CACHE_TTL)
+
+
+CHAT_TOKEN_BUDGET = int(get_setting("CHAT_TOKEN_BUDGET", 1200))
+# newest messages always sent verbatim, older ones get folded into the summary
+CHAT_RECENT_MESSAGES = 6
+CHAT_MESSAGE_CHARS = 600
+CHAT_SUMMARY_CHARS = 1200
+CHAT_MAX_MESSAGES = 200
+CHAT_DATA_TTL = 5 * 60
+CHAT_MAX_STOCKS = 20
+
+
+def estimate_tokens(text):
+    # roughly four characters per token for English text
+    return len(text) // 4 + 1
+
+
+def clip(text, limit):
+    text = " ".join(text.split())
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(" ", 1)[0] + " ..."
+
+
+class ChatMemory:
+    def __init__(self, greeting=None):
+        self.messages = []
+        # messages[:summarized] are already covered by summary
+        self.summarized = 0
+        self.summary = ""
+        self.stocks = OrderedDict()
+        self.focus = []
+        if greeting:
+            self.add("assistant", greeting)
+
+    def add(self, role, content):
+        self.messages.append({"role": role, "content": content})
+        # only turns that made it into the summary are ever dropped
+        drop = min(len(self.messages) - CHAT_MAX_MESSAGES, self.summarized)
+        if drop > 0:
+            del self.messages[:drop]
+            self.summarized -= drop
+
+    def remember(self, stocks):
+        now = time.time()
+        for stock in stocks:
+            entry = self.stocks.get(stock.symbol)
+            # reused data keeps its original fetch time so it still expires
+            fetched_at = entry[1] if entry and entry[0] is stock else now
+            self.stocks[stock.symbol] = (stock, fetched_at)
+            self.stocks.move_to_end(stock.symbol)
+        while len(self.stocks) > CHAT_MAX_STOCKS:
+            self.stocks.popitem(last=False)
+        self.focus = [stock.symbol for stock in stocks]
+
+    def known(self, symbols, max_age=CHAT_DATA_TTL):
+        now = time.time()
+        found = {}
+        for symbol in symbols:
+            entry = self.stocks.get(symbol)
+            if entry and now - entry[1] < max_age:
+                found[symbol] = entry[0]
+        return found
+
+    def context(self, budget=CHAT_TOKEN_BUDGET):
+        used = estimate_tokens(self.summary) if self.summary else 0
+        lines = []
+        for m in reversed(self.messages[self.summarized:]):
+            line = f"{m['role']}: {clip(m['content'], CHAT_MESSAGE_CHARS)}"
+            cost = estimate_tokens(line)
+            if lines and used + cost > budget:
+                break
+            lines.append(line)
+            used += cost
+        convo = "\n".join(reversed(lines))
+        if self.summary:
+            convo = f"Summary of earlier conversation: {self.summary}\n\n{convo}"
+        return convo
+
+    def compact(self, model, budget=CHAT_TOKEN_BUDGET):
+        # fold everything but the newest messages into the rolling summary
+        # once the unsummarized part no longer fits the budget, in batches of
+        # at least CHAT_RECENT_MESSAGES so it is not an extra call every turn
+        end = len(self.messages) - CHAT_RECENT_MESSAGES
+        recent = sum(estimate_tokens(m["content"]) for m in self.messages[self.summarized:])
+        if end - self.summarized < CHAT_RECENT_MESSAGES or recent + estimate_tokens(self.summary) <= budget:
+            return False
+
+        older = "\n".join(
+            f"{m['role']}: {clip(m['content'], CHAT_MESSAGE_CHARS)}" for m in self.messages[self.summarized:end]
+        )
+        prompt = f"""
+Update the running summary of a chat between a user and a stock assistant.
+Keep the tickers discussed, figures quoted, and the user's goals and risk preferences.
+Answer in at most 120 words of plain text.
+
+Current summary:
+{self.summary or "(none)"}
+
+New messages:
+{older}
+"""
+        try:
+            summary = generate(
+                model, prompt, {"temperature": 0.2, "max_output_tokens": 200}, label="chat_summary"
+            ).text
+        except Exception as e:
+            print("Chat summary error:", e)
+            summary = f"{self.summary} {clip(older, CHAT_SUMMARY_CHARS // 2)}"
+
+        self.summary = clip(summary, CHAT_SUMMARY_CHARS)
+        self.summarized = end
+        return True
+
+
+# asyncio variants share the cache, key pool and reply parsing with the
+# sync fetchers; only the transport differs (one httpx client per loop)
+async_state = {"loop": None, "client": None, "semaphore": None, "tasks_loop": None, "tasks": {}}
+
+
+def get_async_client():
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    if async_state["loop"] is not loop:
+        async_state["loop"] = loop
+        async_state["client"] = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=HTTP_POOL_SIZE, max_keepalive_connections=HTTP_POOL_SIZE),
+            transport=httpx.AsyncHTTPTransport(retries=HTTP_RETRIES),
+            headers={"Accept-Encoding": "gzip, deflate"},
+        )
+        async_state["semaphore"] = asyncio.Semaphore(max(ASYNC_CONCURRENCY, 1))
+    return async_state["client"], async_state["semaphore"]
+
+
+async def close_async_client():
+    client = async_state["client"]
+    async_state.update(loop=None, client=None, semaphore=None)
+    if client is not None:
+        await client.aclose()
+
+
+async def async_fetch_alpha_vantage(params, api_key, expected_key, timeout=3):
+    import httpx
+
+    client, semaphore = get_async_client()
+    async with semaphore:
+        metrics.incr("alphavantage_key_calls_total", key=api_key[-4:])
+        with timed("alphavantage_request_seconds", function=params.get("function"), transport="async"):
+            try:
+                response = await client.get(
+                    ALPHA_VANTAGE_URL,
+                    params={**params, "apikey": api_key},
+                    timeout=timeout
+                )
+                if response.status_code == 429:
+                    raise RateLimitError(f"{params.get('function')}: HTTP 429")
+                data = response.json()
+            except (httpx.HTTPError, ValueError) as e:
+                raise TransientAPIError(f"{params.get('function')} {params.get('symbol')}: {e}") from e
+
+            return parse_alpha_vantage(data, params, expected_key)
+
+
+async def async_get_stock_quote(symbol, api_key, timeout=3):
+    data = await async_fetch_alpha_vantage({"function": "GLOBAL_QUOTE", "symbol": symbol}, api_key, "Global Quote", timeout)
+    if data:
+        return data["Global Quote"]
+    return None
+
+async def async_get_company_overview(symbol, api_key, timeout=3):
+    return await async_fetch_alpha_vantage({"function": "OVERVIEW", "symbol": symbol}, api_key, "Symbol", timeout)
+
+async def async_get_time_series_data(symbol, api_key, period, timeout=3, outputsize="compact"):
+    function, key = time_series_function(period)
+    params = {"function": function, "symbol": symbol, "outputsize": outputsize}
+    if period in INTRADAY_INTERVALS:
+        params["interval"] = period
+    data = await async_fetch_alpha_vantage(params, api_key, key, timeout)
+    if data:
+        return data[key], key
+    return None, None
+
+
+async def async_safe_api_call(func, symbol, period=None):
+    name = func.__name__.removeprefix("async_")
+    cache_key = (name, symbol, period)
+    popularity.record(cache_key)
+    with timed("api_call_seconds", endpoint=name, transport="async") as labels:
+        hit, cached = response_cache.get(cache_key)
+        if hit:
+            labels["cache"] = "hit"
+            return cached
+
+        labels["cache"] = "miss"
+        loop = asyncio.get_running_loop()
+        if async_state["tasks_loop"] is not loop:
+            async_state["tasks_loop"] = loop
+            async_state["tasks"] = {}
+        tasks = async_state["tasks"]
+
+        task = tasks.get(cache_key)
+        in_flight.record(leader=task is None)
+        if task is None:
+            task = loop.create_task(async_call_with_retries(func, symbol, period))
+            tasks[cache_key] = task
+            task.add_done_callback(lambda done: tasks.pop(cache_key, None) if tasks.get(cache_key) is done else None)
+
+        result = await asyncio.shield(task)
+        if not (result[0] if period else result):
+            labels["outcome"] = "empty"
+        return result
+
+
+async def async_call_with_retries(func, symbol, period=None, refresh=False):
+    name = func.__name__.removeprefix("async_")
+    if not refresh:
+        hit, cached = response_cache.get((name, symbol, period), record=False)
+        if hit:
+            return cached
+
+    empty = (None, None) if period else None
+    args = (period,) if period else ()
+
+    for attempt in range(MAX_API_ATTEMPTS):
+        key, delay = acquire_key()
+        if key is None:
+            if delay is None:
+                return empty
+            await asyncio.sleep(delay)
+            continue
+
+        try:
+            result = await func(symbol, key, *args, timeout=REQUEST_TIMEOUT)
+        except API_ERRORS as e:
+            delay = retry_delay(e, key, attempt)
+            if delay is None:
+                return empty
+            await asyncio.sleep(delay)
+            continue
+
+        store_result(name, symbol, period, result)
+        return result
+
+    return empty
+
+
+def get_quotes(symbols, timeout=BUNDLE_TIMEOUT):
+    symbols = list(dict.fromkeys(symbols))
+    quotes = {}
+    pending = []
+    for symbol in symbols:
+        hit, quote = response_cache.get(("get_stock_quote", symbol, None))
+        if hit:
+            quotes[symbol] = quote
+        else:
+            pending.append(symbol)
+
+    if pending and time.time() >= bulk_quotes_state["disabled_until"]:
+        chunks = [pending[i:i + BULK_QUOTE_CHUNK] for i in range(0, len(pending), BULK_QUOTE_CHUNK)]
+        futures = [fetch_executor.submit(safe_api_call, get_bulk_quotes, ",".join(chunk)) for chunk in chunks]
+        wait(futures, timeout=timeout)
+        for future in futures:
+            rows = future.result() if future.done() and not future.exception() else None
+            if rows is None:
+                continue
+            for quote in rows:
+                symbol = quote["01. symbol"]
+                quotes[symbol] = quote
+                response_cache.set(("get_stock_quote", symbol, None), quote, cache_ttl("get_stock_quote"))
+        pending = [symbol for symbol in pending if symbol not in quotes]
+
+    failed = []
+    if pending:
+        bundle, bundle_failed = fetch_bundle(pending, ["quote"], timeout=timeout)
+        for symbol in pending:
+            if "quote" in bundle[symbol]:
+                quotes[symbol] = bundle[symbol]["quote"]
+        failed = [(symbol, reason) for symbol, _, reason in bundle_failed]
+
+    return {symbol: quotes[symbol] for symbol in symbols if symbol in quotes}, failed
+
+
+PREWARM_TOP_N = int(get_setting("PREWARM_TOP_N", 20))
+PREWARM_INTERVAL = float(get_setting("PREWARM_INTERVAL", 5))
+# refresh once less than this share of an entry's TTL is left
+PREWARM_REFRESH_AHEAD = 0.2
+# tokens left untouched for user-facing requests
+PREWARM_RESERVE = float(get_setting("PREWARM_RESERVE", 2))
+# share of the pool's daily calls the prewarmer never dips into
+PREWARM_DAY_RESERVE = float(get_setting("PREWARM_DAY_RESERVE", 0.5))
+# a key needs this many recent views, and one within its TTL, to be refreshed
+PREWARM_MIN_SCORE = float(get_setting("PREWARM_MIN_SCORE", 3))
+PREWARM_DECAY = 0.98
+PREWARM_FETCHERS = {
+    "get_stock_quote": get_stock_quote,
+    "get_company_overview": get_company_overview,
+}
+
+
+class Prewarmer(threading.Thread):
+    def __init__(self, top_n=PREWARM_TOP_N, interval=PREWARM_INTERVAL):
+        super().__init__(name="av-prewarm", daemon=True)
+        self.top_n = top_n
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.refreshed = 0
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.tick()
+            except Exception as e:
+                print("Prewarm error:", e)
+
+    def stop(self):
+        self.stopped.set()
+
+    def tick(self):
+        day_reserve = key_pool.day_capacity() * PREWARM_DAY_RESERVE
+        for cache_key in popularity.top(self.top_n, PREWARM_MIN_SCORE):
+            name, symbol, period = cache_key
+            func = PREWARM_FETCHERS.get(name)
+            if func is None:
+                continue
+            if key_pool.spare_tokens() <= PREWARM_RESERVE or key_pool.spare_day_calls() <= day_reserve:
+                break
+            ttl = cache_ttl(name, period)
+            if time.time() - popularity.last_seen(cache_key) > ttl:
+                continue
+            # only refresh what a user fetched successfully; failed and
+            # mistyped lookups are never cached and never prewarmed
+            remaining = response_cache.expires_in(cache_key)
+            if remaining is None or remaining > ttl * PREWARM_REFRESH_AHEAD:
+                continue
+            in_flight.do(cache_key, lambda: call_with_retries(func, symbol, period, refresh=True))
+            self.refreshed += 1
+        popularity.decay(PREWARM_DECAY)
+
+
+@st.cache_resource
+def start_prewarmer():
+    prewarmer = Prewarmer()
+    prewarmer.start()
+    start_metrics_server()
+    return prewarmer
+
+
+FUNDAMENTAL_TEXT_FIELDS = {
+    "Name": "name",
+    "Sector": "sector",
+    "Industry": "industry",
+    "Exchange": "exchange",
+}
+FUNDAMENTAL_NUMBER_FIELDS = {
+    "MarketCapitalization": "market_cap",
+    "PERatio": "pe",
+    "ForwardPE": "forward_pe",
+    "EPS": "eps",
+    "Beta": "beta",
+    "DividendYield": "dividend_yield",
+    "ProfitMargin": "profit_margin",
+    "QuarterlyRevenueGrowthYOY": "revenue_growth",
+    "QuarterlyEarningsGrowthYOY": "earnings_growth",
+    "52WeekHigh": "week52_high",
+    "52WeekLow": "week52_low",
+}
+
+
+def parse_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
         return None
-    except:
+
+
+class FundamentalsStore:
+    def __init__(self, db_path=HISTORY_DB_PATH):
+        self.db = sqlite3.connect(db_path, timeout=SQLITE_TIMEOUT, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.frame = None
+        self.frame_version = None
+        columns = ", ".join(
+            [f"{c} TEXT" for c in FUNDAMENTAL_TEXT_FIELDS.values()]
+            + [f"{c} REAL" for c in FUNDAMENTAL_NUMBER_FIELDS.values()]
+        )
+        with self.lock:
+            self.db.execute(
+                f"CREATE TABLE IF NOT EXISTS fundamentals (symbol TEXT PRIMARY KEY, {columns}, updated_at REAL)"
+            )
+            self.db.commit()
+
+    def upsert(self, overviews):
+        rows = []
+        for symbol, data in overviews:
+            rows.append(
+                (symbol,)
+                + tuple(data.get(k) for k in FUNDAMENTAL_TEXT_FIELDS)
+                + tuple(parse_number(data.get(k)) for k in FUNDAMENTAL_NUMBER_FIELDS)
+                + (time.time(),)
+            )
+        if not rows:
+            return
+        placeholders = ", ".join("?" * len(rows[0]))
+        with self.lock:
+            with self.db:
+                self.db.executemany(f"INSERT OR REPLACE INTO fundamentals VALUES ({placeholders})", rows)
+
+    def fresh_symbols(self, max_age):
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT symbol FROM fundamentals WHERE updated_at > ?", (time.time() - max_age,)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def load(self):
+        import pandas as pd
+
+        with self.lock:
+            # asked of the database, ingest.py and other server processes write here too
+            version = self.db.execute("SELECT COUNT(*), MAX(updated_at) FROM fundamentals").fetchone()
+            if self.frame is not None and self.frame_version == version:
+                return self.frame
+            frame = pd.read_sql_query("SELECT * FROM fundamentals", self.db)
+
+        for column in FUNDAMENTAL_NUMBER_FIELDS.values():
+            frame[column] = frame[column].astype("float64")
+        for column in ("sector", "industry", "exchange"):
+            frame[column] = frame[column].astype("category")
+        frame = frame.set_index("symbol").sort_index()
+
+        with self.lock:
+            self.frame = frame
+            self.frame_version = version
+        return frame
+
+
+@functools.lru_cache(maxsize=None)
+def get_fundamentals_store():
+    return FundamentalsStore()
+
+
+def record_fundamentals(symbol, data):
+    get_fundamentals_store().upsert([(symbol, data)])
+
+
+RESULT_HOOKS.setdefault("get_company_overview", []).append(record_fundamentals)
+
+
+def listed_symbols():
+    return list(get_ticker_resolver().symbols)
+
+
+# a background job, kept off fetch_executor so page fetches never queue behind it
+INGEST_WORKERS = 4
+ingest_executor = ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix="fundamentals-ingest")
+
+
+class FundamentalsIngest(threading.Thread):
+    def __init__(self, symbols, max_age=cache_ttl("get_company_overview")):
+        super().__init__(name="fundamentals-ingest", daemon=True)
+        self.symbols = list(dict.fromkeys(symbols))
+        self.max_age = max_age
+        self.done = 0
+        self.failed = []
+        self.skipped = 0
+        self.started_at = time.time()
+        self.stopped = threading.Event()
+
+    def run(self):
+        fresh = get_fundamentals_store().fresh_symbols(self.max_age)
+        pending = [s for s in self.symbols if s not in fresh]
+        self.skipped = len(self.symbols) - len(pending)
+
+        while pending and not self.stopped.is_set():
+            # only spend what the pool can spare, leaving room for users
+            budget = int(key_pool.spare_tokens() - PREWARM_RESERVE)
+            if budget <= 0:
+                wait_for = key_pool.wait_time()
+                if wait_for is None:
+                    break
+                self.stopped.wait(max(wait_for, 1.0))
+                continue
+
+            batch_size = min(budget, INGEST_WORKERS)
+            batch, pending = pending[:batch_size], pending[batch_size:]
+            futures = {
+                ingest_executor.submit(call_with_retries, get_company_overview, symbol): symbol
+                for symbol in batch
+            }
+            wait(futures)
+            for future, symbol in futures.items():
+                if future.exception() is None and future.result():
+                    self.done += 1
+                else:
+                    self.failed.append(symbol)
+
+        self.failed.extend(pending)
+
+    def stop(self):
+        self.stopped.set()
+
+    def progress(self):
+        total = len(self.symbols) - self.skipped
+        return {
+            "total": total,
+            "done": self.done,
+            "failed": len(self.failed),
+            "skipped": self.skipped,
+            "running": self.is_alive(),
+            "elapsed": time.time() - self.started_at,
+        }
+
+
+ingest_jobs = {}
+ingest_jobs_lock = threading.Lock()
+
+
+def start_fundamentals_ingest(symbols=None):
+    with ingest_jobs_lock:
+        job = ingest_jobs.get("fundamentals")
+        if job is None or not job.is_alive():
+            job = FundamentalsIngest(symbols or listed_symbols())
+            job.start()
+            ingest_jobs["fundamentals"] = job
+        return job
+
+
+def current_fundamentals_ingest():
+    with ingest_jobs_lock:
+        return ingest_jobs.get("fundamentals")
+
+
+def metric_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in sorted(labels.items())) + "}"
+
+
+def metrics_text():
+    lines = []
+    seen = set()
+    # the text format wants all of a family's series together under one TYPE line
+    for row in sorted(metrics.summary(), key=lambda r: (r["name"], sorted(r["labels"].items()))):
+        name = row["name"]
+        if name not in seen:
+            lines.append(f"# TYPE {name} summary")
+            seen.add(name)
+        for q in ("p50", "p95", "p99"):
+            quantile = {"p50": "0.5", "p95": "0.95", "p99": "0.99"}[q]
+            lines.append(f"{name}{metric_labels({**row['labels'], 'quantile': quantile})} {row[q]:.6f}")
+        lines.append(f"{name}_count{metric_labels(row['labels'])} {row['count']}")
+        lines.append(f"{name}_sum{metric_labels(row['labels'])} {row['mean'] * row['count']:.6f}")
+
+    for name, labels, value in sorted(metrics.counter_values(), key=lambda c: c[0]):
+        if name not in seen:
+            lines.append(f"# TYPE {name} counter")
+            seen.add(name)
+        lines.append(f"{name}{metric_labels(labels)} {value}")
+
+    gauges = {
+        "response_cache": response_cache.stats(),
+        "llm_cache": llm_cache.stats(),
+        "single_flight": in_flight.stats(),
+    }
+    for prefix, values in gauges.items():
+        for field, value in values.items():
+            lines.append(f"# TYPE {prefix}_{field} gauge")
+            lines.append(f"{prefix}_{field} {value}")
+
+    key_states = key_pool.stats()
+    for field in ("tokens", "day_calls", "throttles"):
+        lines.append(f"# TYPE key_pool_{field} gauge")
+        for state in key_states:
+            lines.append(f"key_pool_{field}{metric_labels({'key': state['key']})} {state[field]}")
+    return "\n".join(lines) + "\n"
+
+
+METRICS_PORT = get_setting("METRICS_PORT")
+# loopback only unless a scraper on another host is meant to reach it
+METRICS_HOST = get_setting("METRICS_HOST", "127.0.0.1")
+
+
+@st.cache_resource
+def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST):
+    if not port:
         return None
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-def get_time_series_data(symbol, api_key, period, timeout=3):
-    if period == "Daily":
-        function = "TIME_SERIES_DAILY"
-        key = "Time Series (Daily)"
-    elif period == "Weekly":
-        function = "TIME_SERIES_WEEKLY"
-        key = "Weekly Time Series"
-    else:
-        function = "TIME_SERIES_MONTHLY"
-        key = "Monthly Time Series"
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
 
-    url = f"https://www.alphavantage.co/query?function={function}&symbol={symbol}&apikey={api_key}"
-    try:
-        response = requests.get(url, timeout=timeout)
-        data = response.json()
-        if key in data:
-            return data[key], key
-        return None, None
-    except:
-        return None, None
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, int(port)), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
@@ -0,0 +1,151 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+SMA_WINDOWS = (20, 50)
+EMA_SPANS = (12, 26)
+MACD_SIGNAL = 9
+RSI_WINDOW = 14
+BOLLINGER_WINDOW = 20
+BOLLINGER_STDS = 2
+ATR_WINDOW = 14
+VOLATILITY_WINDOW = 20
+# daily and slower bars get a rolling VWAP, intraday bars one per trading day
+VWAP_WINDOW = 20
+# bars of context the rolling windows need in front of the first new bar
+LOOKBACK = max(SMA_WINDOWS + (BOLLINGER_WINDOW, VOLATILITY_WINDOW + 1, VWAP_WINDOW))
+PERIODS_PER_YEAR = {"Daily": 252, "Weekly": 52, "Monthly": 12}
+
+CACHE_SIZE = 64
+indicator_cache = OrderedDict()
+indicator_cache_lock = threading.Lock()
+
+
+def ewm(values, alpha, seed=None):
+    # adjust=False gives the plain recursive EMA, so a run can resume from
+    # the last stored value and match a full recompute exactly
+    if seed is not None and not np.isnan(seed):
+        values = np.concatenate(([seed], values))
+    result = pd.Series(values).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    return result if seed is None or np.isnan(seed) else result[1:]
+
+
+def rolling(values, window):
+    return pd.Series(values).rolling(window)
+
+
+def is_intraday(period):
+    return period is not None and period not in PERIODS_PER_YEAR
+
+
+def session_cumsum(values, days, carry=0.0):
+    # running total that restarts on each new day; carry continues the first day
+    total = np.cumsum(values)
+    new_day = np.concatenate(([True], days[1:] != days[:-1]))
+    starts = np.flatnonzero(new_day)
+    group = np.cumsum(new_day) - 1
+    base = np.concatenate(([0.0], total[starts[1:] - 1]))
+    result = total - base[group]
+    result[group == 0] += carry
+    return result
+
+
+def _compute(frame, start=0, prev=None, intraday=False):
+    def seed(column):
+        return None if prev is None else prev[column]
+
+    close = frame["close"].to_numpy(np.float64)
+    high = frame["high"].to_numpy(np.float64)
+    low = frame["low"].to_numpy(np.float64)
+    volume = frame["volume"].to_numpy(np.float64)
+    new = close[start:]
+    out = {}
+
+    for window in SMA_WINDOWS:
+        out[f"sma_{window}"] = rolling(close, window).mean().to_numpy()[start:]
+
+    for span in EMA_SPANS:
+        out[f"ema_{span}"] = ewm(new, 2 / (span + 1), seed(f"ema_{span}"))
+
+    out["macd"] = out[f"ema_{EMA_SPANS[0]}"] - out[f"ema_{EMA_SPANS[1]}"]
+    out["macd_signal"] = ewm(out["macd"], 2 / (MACD_SIGNAL + 1), seed("macd_signal"))
+    out["macd_hist"] = out["macd"] - out["macd_signal"]
+
+    change = np.diff(close, prepend=close[0])[start:]
+    out["_avg_gain"] = ewm(np.clip(change, 0, None), 1 / RSI_WINDOW, seed("_avg_gain"))
+    out["_avg_loss"] = ewm(np.clip(-change, 0, None), 1 / RSI_WINDOW, seed("_avg_loss"))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out["rsi"] = np.where(
+            out["_avg_loss"] == 0, 100.0, 100 - 100 / (1 + out["_avg_gain"] / out["_avg_loss"])
+        )
+
+    windowed = rolling(close, BOLLINGER_WINDOW)
+    mid = windowed.mean().to_numpy()[start:]
+    std = windowed.std().to_numpy()[start:]
+    out["bb_mid"] = mid
+    out["bb_upper"] = mid + BOLLINGER_STDS * std
+    out["bb_lower"] = mid - BOLLINGER_STDS * std
+
+    prev_close = np.concatenate(([np.nan], close[:-1]))
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    out["atr"] = ewm(true_range[start:], 1 / ATR_WINDOW, seed("atr"))
+
+    typical = (high + low + close) / 3
+    if intraday:
+        days = frame.index.normalize().to_numpy()
+        same_day = prev is not None and start > 0 and days[start] == days[start - 1]
+        pv = session_cumsum(typical[start:] * volume[start:], days[start:], seed("_vwap_pv") if same_day else 0.0)
+        v = session_cumsum(volume[start:], days[start:], seed("_vwap_v") if same_day else 0.0)
+    else:
+        # anchored to the first stored bar it would depend on how much history the store holds
+        pv = rolling(typical * volume, VWAP_WINDOW).sum().to_numpy()[start:]
+        v = rolling(volume, VWAP_WINDOW).sum().to_numpy()[start:]
+    out["_vwap_pv"] = pv
+    out["_vwap_v"] = v
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out["vwap"] = np.where(v > 0, pv / v, np.nan)
+
+    log_returns = np.diff(np.log(close), prepend=np.nan)
+    out["volatility"] = rolling(log_returns, VOLATILITY_WINDOW).std().to_numpy()[start:]
+
+    return pd.DataFrame(out, index=frame.index[start:])
+
+
+def compute_indicators(frame, period=None):
+    return _compute(frame, intraday=is_intraday(period))
+
+
+def update_indicators(indicators, frame, period=None):
+    if indicators is None or len(indicators) == 0 or len(indicators) > len(frame):
+        return compute_indicators(frame, period)
+
+    # the last stored bar may have been revised, so recompute it as well
+    keep = len(indicators) - 1
+    if keep == 0 or not frame.index[:keep].equals(indicators.index[:keep]):
+        return compute_indicators(frame, period)
+
+    context_start = max(0, keep - LOOKBACK)
+    tail = _compute(frame.iloc[context_start:], keep - context_start, indicators.iloc[keep - 1], is_intraday(period))
+    return pd.concat([indicators.iloc[:keep], tail])
+
+
+def get_indicators(frame, symbol, period):
+    key = (symbol, period)
+    with indicator_cache_lock:
+        previous = indicator_cache.get(key)
+
+    indicators = update_indicators(previous, frame, period)
+
+    with indicator_cache_lock:
+        indicator_cache[key] = indicators
+        indicator_cache.move_to_end(key)
+        while len(indicator_cache) > CACHE_SIZE:
+            indicator_cache.popitem(last=False)
+    return indicators
+
+
+def annualized_volatility(indicators, period):
+    return indicators["volatility"].iloc[-1] * np.sqrt(PERIODS_PER_YEAR.get(period, 252))
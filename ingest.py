@@ -0,0 +1,284 @@
+import os
+import sys
+import time
+import queue
+import sqlite3
+import argparse
+import functools
+import multiprocessing
+
+ENDPOINTS = ("quote", "overview", "history")
+# a quote is only cached for seconds, bulk fetching it ahead of traffic wastes the quota
+DEFAULT_ENDPOINTS = ("overview", "history")
+CACHED_FUNCTIONS = {"quote": "get_stock_quote", "overview": "get_company_overview"}
+CHECKPOINT_PATH = "ingest_checkpoint.db"
+PROGRESS_EVERY = 10
+# times a task goes back in the queue when it came back empty on a drained pool
+REQUEUE_LIMIT = 2
+
+
+class Checkpoint:
+    def __init__(self, path=CHECKPOINT_PATH):
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.executescript("""
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS ingest_tasks (
+                symbol TEXT, endpoint TEXT, period TEXT, status TEXT, detail TEXT, updated_at REAL,
+                PRIMARY KEY (symbol, endpoint, period)
+            ) WITHOUT ROWID;
+        """)
+
+    def finished(self, period, retry_failed=True):
+        # quotes and overviews are stored without a period
+        statuses = ("done",) if retry_failed else ("done", "failed")
+        rows = self.db.execute(
+            f"SELECT symbol, endpoint FROM ingest_tasks WHERE period IN (?, '') "
+            f"AND status IN ({', '.join('?' * len(statuses))})",
+            (period,) + statuses
+        ).fetchall()
+        return set(rows)
+
+    def mark(self, period, results):
+        # [(symbol, endpoint, status, detail)]
+        now = time.time()
+        rows = [
+            (symbol, endpoint, period if endpoint == "history" else "", status, detail, now)
+            for symbol, endpoint, status, detail in results
+        ]
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO ingest_tasks VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def reset(self):
+        with self.db:
+            self.db.execute("DELETE FROM ingest_tasks")
+
+
+def fetch(functions, symbol, endpoint, period):
+    f = functions
+    if endpoint == "quote":
+        return f.call_with_retries(f.get_stock_quote, symbol, refresh=True)
+    if endpoint == "overview":
+        return f.call_with_retries(f.get_company_overview, symbol, refresh=True)
+    return f.fetch_seed_series(symbol, period, functools.partial(f.call_with_retries, refresh=True))
+
+
+def flush(functions, period, fetched, cache):
+    f = functions
+    histories = [(symbol, period, data) for symbol, endpoint, data in fetched if endpoint == "history"]
+    overviews = [(symbol, data) for symbol, endpoint, data in fetched if endpoint == "overview"]
+    cached = [
+        ((CACHED_FUNCTIONS[endpoint], symbol, None), data, f.cache_ttl(CACHED_FUNCTIONS[endpoint]))
+        for symbol, endpoint, data in fetched if endpoint in CACHED_FUNCTIONS
+    ]
+    f.get_history_store().merge_many(histories)
+    f.get_fundamentals_store().upsert(overviews)
+    cache.set_many(cached)
+
+
+def worker(shard, keys, tasks, args, progress):
+    # configure functions.py for this process before it is imported
+    os.environ["API_KEYS"] = ",".join(keys)
+    os.environ["KEY_CALLS_PER_MINUTE"] = str(args.per_minute)
+    os.environ["KEY_CALLS_PER_DAY"] = str(args.per_day)
+
+    import functions as f
+    from concurrent.futures import wait
+
+    # writes happen in bulk in flush(), not per call: calls fill a private
+    # in-memory cache and the configured one only sees the flushed batches
+    f.RESULT_HOOKS.clear()
+    cache, f.response_cache = f.response_cache, f.ResponseCache()
+    checkpoint = Checkpoint(args.checkpoint)
+    started = time.time()
+    stats = {"shard": shard, "total": len(tasks), "done": 0, "failed": 0, "calls": 0, "finished": False}
+    fetched, marks = [], []
+    pending = list(tasks)
+    requeued = {}
+    last_report = 0.0
+
+    def report(force=False):
+        nonlocal last_report
+        if force or time.time() - last_report >= PROGRESS_EVERY:
+            stats["elapsed"] = time.time() - started
+            stats["calls"] = sum(row["calls"] for row in f.key_pool.stats())
+            progress.put(dict(stats))
+            last_report = time.time()
+
+    def commit():
+        flush(f, args.period, fetched, cache)
+        checkpoint.mark(args.period, marks)
+        fetched.clear()
+        marks.clear()
+
+    while pending:
+        budget = int(f.key_pool.spare_tokens())
+        if budget <= 0:
+            wait_for = f.key_pool.wait_time()
+            if wait_for is None:
+                # daily quota gone, the rest stays unchecked for a later run
+                break
+            report()
+            time.sleep(max(wait_for, 1.0))
+            continue
+
+        batch, pending = pending[:budget], pending[budget:]
+        futures = {
+            f.fetch_executor.submit(fetch, f, symbol, endpoint, args.period): (symbol, endpoint)
+            for symbol, endpoint in batch
+        }
+        wait(futures)
+        drained = f.key_pool.spare_tokens() < 1
+        for future, (symbol, endpoint) in futures.items():
+            error = future.exception()
+            data = None if error else future.result()
+            if data:
+                fetched.append((symbol, endpoint, data))
+                marks.append((symbol, endpoint, "done", None))
+                stats["done"] += 1
+            elif drained and not error and requeued.get((symbol, endpoint), 0) < REQUEUE_LIMIT:
+                # most likely starved of keys rather than a bad symbol
+                requeued[(symbol, endpoint)] = requeued.get((symbol, endpoint), 0) + 1
+                pending.append((symbol, endpoint))
+            else:
+                marks.append((symbol, endpoint, "failed", str(error) if error else "no data"))
+                stats["failed"] += 1
+
+        if len(marks) >= args.batch:
+            commit()
+        report()
+
+    commit()
+    stats["finished"] = True
+    stats["remaining"] = len(pending)
+    report(force=True)
+
+
+def shard(items, count):
+    return [items[i::count] for i in range(count)]
+
+
+def read_symbols(args, functions):
+    if args.symbols:
+        symbols = args.symbols.split(",")
+    elif args.file:
+        with open(args.file) as f:
+            symbols = [line.split(",")[0] for line in f if line.strip() and not line.startswith("#")]
+        if symbols and symbols[0].strip().lower() == "symbol":
+            symbols = symbols[1:]
+    else:
+        symbols = functions.listed_symbols()
+    return list(dict.fromkeys(s.strip().upper() for s in symbols if s.strip()))
+
+
+def print_progress(shards, started):
+    lines = []
+    for stats in sorted(shards.values(), key=lambda s: s["shard"]):
+        handled = stats["done"] + stats["failed"]
+        rate = handled / stats["elapsed"] * 60 if stats.get("elapsed") else 0.0
+        if stats["finished"]:
+            state = "finished"
+        elif rate:
+            state = f"eta {(stats['total'] - handled) / rate:.0f} min"
+        else:
+            state = "waiting"
+        lines.append(
+            f"  shard {stats['shard']}: {handled}/{stats['total']} tasks, {stats['failed']} failed, "
+            f"{stats['calls']} calls, {rate:.1f} tasks/min, {state}"
+        )
+    print(f"[{time.time() - started:7.0f}s]", file=sys.stderr)
+    print("\n".join(lines), file=sys.stderr)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Warm the local stores for many symbols in parallel. API_KEYS are split between "
+                    "the worker processes and each paces its own slice. Finished tasks are "
+                    "checkpointed, so rerunning the same command after a crash or an exhausted "
+                    "daily quota picks up where it stopped.",
+        epilog="example: python ingest.py --workers 4 --endpoints overview,history --file symbols.txt",
+    )
+    parser.add_argument("--symbols", help="comma separated tickers")
+    parser.add_argument("--file", help="one ticker per line, e.g. data/listings.csv (default: all listed)")
+    parser.add_argument("--endpoints", default=",".join(DEFAULT_ENDPOINTS),
+                        help="any of quote,overview,history (quotes expire within a minute, so not by default)")
+    parser.add_argument("--period", default="Daily", choices=["Daily", "Weekly", "Monthly"])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--per-minute", type=int, default=None, help="calls per key per minute")
+    parser.add_argument("--per-day", type=int, default=None, help="calls per key per day")
+    parser.add_argument("--batch", type=int, default=50, help="results per bulk write")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH)
+    parser.add_argument("--restart", action="store_true", help="forget the checkpoint and start over")
+    parser.add_argument("--skip-failed", action="store_true", help="do not retry tasks that failed before")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    import functions
+
+    args.per_minute = args.per_minute or functions.KEY_CALLS_PER_MINUTE
+    args.per_day = args.per_day or functions.KEY_CALLS_PER_DAY
+    endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        sys.exit(f"unknown endpoints: {', '.join(sorted(unknown))}")
+    keys = functions.API_KEYS
+    if not keys:
+        sys.exit("no API_KEYS configured")
+
+    checkpoint = Checkpoint(args.checkpoint)
+    if args.restart:
+        checkpoint.reset()
+    finished = checkpoint.finished(args.period, retry_failed=not args.skip_failed)
+    symbols = read_symbols(args, functions)
+    tasks = [(s, e) for s in symbols for e in endpoints if (s, e) not in finished]
+    print(f"{len(symbols)} symbols, {len(tasks)} tasks to run, {len(finished)} already checkpointed", file=sys.stderr)
+    if not tasks:
+        return
+
+    workers = max(1, min(args.workers, len(keys), len(tasks)))
+    context = multiprocessing.get_context("spawn")
+    progress = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(i, key_slice, task_slice, args, progress), name=f"ingest-{i}")
+        for i, (key_slice, task_slice) in enumerate(zip(shard(keys, workers), shard(tasks, workers)))
+    ]
+    started = time.time()
+    for process in processes:
+        process.start()
+
+    shards = {}
+    try:
+        while any(process.is_alive() for process in processes) or not progress.empty():
+            if len(shards) == len(processes) and all(s["finished"] for s in shards.values()):
+                break
+            try:
+                stats = progress.get(timeout=PROGRESS_EVERY)
+                shards[stats["shard"]] = stats
+            except queue.Empty:
+                pass
+            else:
+                while not progress.empty():
+                    stats = progress.get()
+                    shards[stats["shard"]] = stats
+            print_progress(shards, started)
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+        print("interrupted, rerun the same command to resume", file=sys.stderr)
+    for process in processes:
+        process.join()
+
+    elapsed = time.time() - started
+    done = sum(s["done"] for s in shards.values())
+    failed = sum(s["failed"] for s in shards.values())
+    remaining = sum(s.get("remaining", 0) for s in shards.values())
+    print(
+        f"{done} tasks done, {failed} failed, {remaining} left for a later run "
+        f"in {elapsed:.0f}s ({done / elapsed * 60:.1f} tasks/min)",
+        file=sys.stderr
+    )
+
+
+if __name__ == "__main__":
+    main()
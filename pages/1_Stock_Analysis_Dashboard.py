@@ -1,20 +1,21 @@
 import streamlit as st
-import requests
-import pandas as pd
-import plotly.graph_objects as go
-from datetime import datetime
+from datetime import datetime, timedelta
 import sys
 from pathlib import Path
-sys.path.append(str(Path(__file__).parent.parent))
+ROOT = str(Path(__file__).parent.parent)
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
 from functions import (
-    safe_api_call,
-    reset_key_index,
-    get_stock_quote,
-    get_company_overview,
-    get_time_series_data
+    fetch_bundle,
+    to_ohlcv_frame,
+    downsample_ohlcv,
+    start_prewarmer,
+    get_intraday_feed,
+    INTRADAY_INTERVALS,
 )
 
 st.set_page_config(page_title="Stock Analysis Dashboard", page_icon="📈", layout="wide")
+start_prewarmer()
 
 st.title("Stock Analysis Dashboard")
 st.write("Analyze individual stocks with real-time data and interactive visualizations")
@@ -24,14 +25,123 @@ symbol = st.sidebar.text_input("Enter Stock Symbol", "AAPL", help="e.g., AAPL, M
 
 time_period = st.sidebar.selectbox(
     "Select Time Period",
-    ["Daily", "Weekly", "Monthly"],
+    ["Daily", "Weekly", "Monthly", "Intraday"],
     index=0
 )
+intraday = time_period == "Intraday"
+if intraday:
+    interval = st.sidebar.selectbox("Interval", INTRADAY_INTERVALS, index=1)
+    chart_period = f"{interval} Intraday"
+else:
+    interval = None
+    chart_period = time_period
+
+HISTORY_RANGES = {"6 Months": 182, "1 Year": 365, "5 Years": 5 * 365, "Max": None}
+history_range = st.sidebar.selectbox("History Range", list(HISTORY_RANGES), index=1)
+
+OVERLAYS = {
+    "SMA 20": ["sma_20"],
+    "SMA 50": ["sma_50"],
+    "EMA 12": ["ema_12"],
+    "EMA 26": ["ema_26"],
+    "Bollinger Bands": ["bb_upper", "bb_mid", "bb_lower"],
+    "VWAP": ["vwap"],
+}
+overlays = st.sidebar.multiselect("Chart Overlays", list(OVERLAYS), default=["SMA 20", "SMA 50"])
+
+LIVE_REFRESH_SECONDS = 15
+
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def live_chart(symbol, interval, overlays):
+    import plotly.graph_objects as go
+    from indicators import get_indicators
+
+    # the feed is shared across sessions, so this only hits the API when
+    # the interval's bars are due and no other viewer has fetched them yet
+    frame, added = get_intraday_feed(symbol, interval).poll()
+    if frame is None:
+        st.error(f"Could not fetch intraday data for {symbol}. Please check the symbol and try again.")
+        return
+
+    indicators = get_indicators(frame, symbol, interval)
+    chart_df = downsample_ohlcv(frame)
+    chart_indicators = indicators.loc[chart_df.index]
+    columns = [column for overlay in overlays for column in OVERLAYS[overlay]]
+
+    key = (symbol, interval, tuple(columns))
+    live = st.session_state.get("live_chart")
+    if live is None or live["key"] != key:
+        fig = go.Figure(data=[go.Candlestick(name=symbol)])
+        for column in columns:
+            fig.add_trace(go.Scatter(
+                name=column.replace("_", " ").upper(),
+                mode="lines",
+                line={"width": 1}
+            ))
+        fig.update_layout(
+            title=f"{symbol} {interval} Intraday Price",
+            yaxis_title="Price (USD)",
+            xaxis_title="Time",
+            template="plotly_white",
+            height=500,
+            hovermode='x unified',
+            xaxis_rangeslider_visible=False,
+            uirevision=f"{symbol}-{interval}"
+        )
+        live = st.session_state["live_chart"] = {"key": key, "fig": fig, "frame": None}
+
+    fig = live["fig"]
+    if live["frame"] is not frame:
+        # patch the trace data in place, layout and the user's zoom stay put
+        with fig.batch_update():
+            fig.data[0].update(
+                x=chart_df.index,
+                open=chart_df['open'],
+                high=chart_df['high'],
+                low=chart_df['low'],
+                close=chart_df['close']
+            )
+            for trace, column in zip(fig.data[1:], columns):
+                trace.update(x=chart_df.index, y=chart_indicators[column])
+        live["frame"] = frame
+
+    st.plotly_chart(fig, use_container_width=True, key="live_price_chart")
+
+    latest = indicators.iloc[-1]
+    last_close = float(frame['close'].iloc[-1])
+    previous_close = float(frame['close'].iloc[-2]) if len(frame) > 1 else last_close
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.metric("Last Price", f"${last_close:.2f}", f"{last_close - previous_close:.2f}")
+
+    with col2:
+        st.metric("RSI (14)", f"{latest['rsi']:.1f}")
+
+    with col3:
+        st.metric("VWAP", f"${latest['vwap']:.2f}")
+
+    with col4:
+        st.metric("Bars", f"{len(frame):,}", f"+{added}" if added else None)
+
+    st.caption(f"Last bar {frame.index[-1]:%Y-%m-%d %H:%M}. Refreshes every {LIVE_REFRESH_SECONDS}s.")
+
+
+analyze = st.sidebar.button("Analyze Stock", type="primary")
+if analyze:
+    # live mode has to outlive the click, any other sidebar widget reruns the page with the button up
+    st.session_state.live_symbol = symbol if intraday else None
+live = intraday and st.session_state.get("live_symbol") == symbol
+
+if analyze:
+    import plotly.graph_objects as go
+    from indicators import get_indicators, annualized_volatility
 
-if st.sidebar.button("Analyze Stock", type="primary"):
     with st.spinner(f"Fetching data for {symbol}..."):
-        reset_key_index()
-        quote = safe_api_call(get_stock_quote, symbol)
+        endpoints = ["quote", "overview"] if intraday else ["quote", "overview", "history"]
+        bundle, failed = fetch_bundle([symbol], endpoints, period=time_period)
+        quote = bundle[symbol].get("quote")
 
         if quote:
             st.header(f"{symbol} - Current Quote")
@@ -69,8 +179,7 @@ if st.sidebar.button("Analyze Stock", type="primary"):
             st.divider()
 
             st.header(f"{symbol} - Company Information")
-            reset_key_index()
-            company = safe_api_call(get_company_overview, symbol)
+            company = bundle[symbol].get("overview")
 
             if company and "Symbol" in company:
                 col1, col2 = st.columns(2)
@@ -102,27 +211,44 @@ if st.sidebar.button("Analyze Stock", type="primary"):
 
             st.divider()
 
-            st.header(f"{symbol} - {time_period} Price Chart")
-            reset_key_index()
-            time_series, key = safe_api_call(get_time_series_data, symbol, time_period)
+            st.header(f"{symbol} - {chart_period} Price Chart")
+            history = bundle[symbol].get("history")
 
-            if time_series:
-                df = pd.DataFrame.from_dict(time_series, orient='index')
-                df.index = pd.to_datetime(df.index)
-                df = df.sort_index()
+            if intraday:
+                live_chart(symbol, interval, overlays)
 
-                df.columns = [col.split('. ')[1] for col in df.columns]
-                df = df.astype(float)
+            elif history:
+                df = to_ohlcv_frame(history, symbol, time_period)
+                indicators = get_indicators(df, symbol, time_period)
+
+                days = HISTORY_RANGES[history_range]
+                if days:
+                    in_range = df.index >= datetime.now() - timedelta(days=days)
+                    df = df[in_range]
+                    indicators = indicators[in_range]
+
+                chart_df = downsample_ohlcv(df)
 
                 fig = go.Figure(data=[go.Candlestick(
-                    x=df.index,
-                    open=df['open'],
-                    high=df['high'],
-                    low=df['low'],
-                    close=df['close'],
+                    x=chart_df.index,
+                    open=chart_df['open'],
+                    high=chart_df['high'],
+                    low=chart_df['low'],
+                    close=chart_df['close'],
                     name=symbol
                 )])
 
+                chart_indicators = indicators.loc[chart_df.index]
+                for overlay in overlays:
+                    for column in OVERLAYS[overlay]:
+                        fig.add_trace(go.Scatter(
+                            x=chart_df.index,
+                            y=chart_indicators[column],
+                            name=column.replace("_", " ").upper(),
+                            mode="lines",
+                            line={"width": 1}
+                        ))
+
                 fig.update_layout(
                     title=f"{symbol} {time_period} Stock Price",
                     yaxis_title="Price (USD)",
@@ -135,10 +261,13 @@ if st.sidebar.button("Analyze Stock", type="primary"):
 
                 st.plotly_chart(fig, use_container_width=True)
 
+                if len(chart_df) < len(df):
+                    st.caption(f"{len(df):,} bars grouped into {len(chart_df):,} candles. Pick a shorter History Range for full detail.")
+
                 st.subheader("Trading Volume")
                 fig_volume = go.Figure(data=[go.Bar(
-                    x=df.index,
-                    y=df['volume'],
+                    x=chart_df.index,
+                    y=chart_df['volume'],
                     name="Volume",
                     marker_color='lightblue'
                 )])
@@ -169,6 +298,22 @@ if st.sidebar.button("Analyze Stock", type="primary"):
                     price_change = ((df['close'].iloc[-1] - df['close'].iloc[0]) / df['close'].iloc[0]) * 100
                     st.metric("Period Change", f"{price_change:.2f}%")
 
+                st.subheader("Technical Indicators")
+                latest = indicators.iloc[-1]
+                col1, col2, col3, col4 = st.columns(4)
+
+                with col1:
+                    st.metric("RSI (14)", f"{latest['rsi']:.1f}")
+
+                with col2:
+                    st.metric("MACD", f"{latest['macd']:.2f}", f"{latest['macd_hist']:.2f} vs signal")
+
+                with col3:
+                    st.metric("ATR (14)", f"${latest['atr']:.2f}")
+
+                with col4:
+                    st.metric("Volatility (20, annualized)", f"{annualized_volatility(indicators, time_period) * 100:.1f}%")
+
             else:
                 st.error(f"Could not fetch time series data for {symbol}. Please check the symbol and try again.")
 
@@ -176,6 +321,10 @@ if st.sidebar.button("Analyze Stock", type="primary"):
             st.error(f"Could not find stock data for symbol: {symbol}. Please check the symbol and try again. or API Keys exhausted")
             st.info("Common symbols: AAPL (Apple), MSFT (Microsoft), GOOGL (Google), TSLA (Tesla), AMZN (Amazon)")
 
+elif live:
+    st.header(f"{symbol} - {chart_period} Price Chart")
+    live_chart(symbol, interval, overlays)
+
 with st.expander("How to Use This Dashboard"):
     st.write("""
     1. Enter stock ticker
@@ -1,76 +1,16 @@
 import streamlit as st
-import google.generativeai as genai
 
 from functions import (
-    safe_api_call,
-    reset_key_index,
-    get_stock_quote,
-    get_company_overview,
+    Stock, fetch_bundle, to_ohlcv_frame, stream_generate, start_prewarmer, get_gemini_model,
+    history_calls_needed, key_pool
 )
 
+BACKTEST_YEARS = 5
 
 
 
-genai.configure(api_key=st.secrets["GOOGLE_API_KEY"])
-model = genai.GenerativeModel("models/gemini-2.0-flash")
-
-
-
-
-class Stock:
-    def __init__(self, symbol, quote_data, company_data):
-        self.symbol = symbol
-        self.quote_data = quote_data
-        self.company_data = company_data
-        self.domain = (
-            company_data.get("OfficialSite", "")
-            .replace("https://", "")
-            .replace("http://", "")
-            .replace("www.", "")
-            .split("/")[0]
-        )
-
-    def summary(self):
-        price_keys = {
-            "05. price": "Price",
-            "02. open": "Open",
-            "03. high": "High",
-            "04. low": "Low",
-            "10. change percent": "Change %"
-        }
-
-        company_keys = {
-            "Name": "Name",
-            "Sector": "Sector",
-            "Industry": "Industry",
-            "MarketCapitalization": "Market Cap",
-            "PERatio": "P/E",
-            "ForwardPE": "Forward P/E",
-            "EPS": "EPS",
-            "Beta": "Beta",
-            "DividendYield": "Dividend Yield",
-            "52WeekHigh": "52W High",
-            "52WeekLow": "52W Low",
-            "QuarterlyRevenueGrowthYOY": "Revenue Growth YoY",
-            "QuarterlyEarningsGrowthYOY": "Earnings Growth YoY"
-        }
-
-        summary_text = f"{self.symbol} Summary:\n"
-
-        for key, label in price_keys.items():
-            if key in self.quote_data:
-                summary_text += f"{label}: {self.quote_data[key]}\n"
-
-        summary_text += "\n"
-
-        for key, label in company_keys.items():
-            if key in self.company_data:
-                summary_text += f"{label}: {self.company_data[key]}\n"
-
-        return summary_text
-
-
 st.set_page_config(page_title="AI Stock Analyst", page_icon="💼", layout="wide")
+start_prewarmer()
 
 st.title("AI Stock Analyst")
 st.write("Enter two stocks for comparison and specify your risk profile to receive tailored investment guidance.")
@@ -95,13 +35,14 @@ if st.button("Generate"):
 
     with st.spinner("Generating comparison..."):
 
-        reset_key_index()
 
-        s1 = safe_api_call(get_stock_quote, symbol_1)
-        c1 = safe_api_call(get_company_overview, symbol_1)
+        bundle, failed = fetch_bundle([symbol_1, symbol_2], ["quote", "overview"])
+
+        s1 = bundle[symbol_1].get("quote")
+        c1 = bundle[symbol_1].get("overview")
 
-        s2 = safe_api_call(get_stock_quote, symbol_2)
-        c2 = safe_api_call(get_company_overview, symbol_2)
+        s2 = bundle[symbol_2].get("quote")
+        c2 = bundle[symbol_2].get("overview")
 
         if not s1 or not s2 or not c1 or not c2:
             st.error("All API keys exhausted or rate limited.")
@@ -133,6 +74,35 @@ if st.button("Generate"):
         summary1 = stock1.summary()
         summary2 = stock2.summary()
 
+        from datetime import datetime, timedelta
+        from backtest import run_backtest, summarize_backtest
+
+        # history is a nice-to-have, only spend calls on it when the keys can spare them
+        histories = {}
+        needed = sum(history_calls_needed(symbol) for symbol in (symbol_1, symbol_2))
+        if needed <= key_pool.spare_tokens():
+            since = datetime.now() - timedelta(days=BACKTEST_YEARS * 365)
+            history_bundle, _ = fetch_bundle([symbol_1, symbol_2], ["history"])
+            for symbol in (symbol_1, symbol_2):
+                frame = to_ohlcv_frame(history_bundle[symbol].get("history"), symbol, "Daily")
+                histories[symbol] = frame[frame.index >= since] if frame is not None else None
+        else:
+            st.caption("Skipped the historical backtest, the API keys are short on calls right now.")
+
+        backtest = run_backtest(histories) if histories else None
+        performance = ""
+        if backtest:
+            performance = "Historical performance (50/50 portfolio strategies and each stock alone):\n"
+            performance += summarize_backtest(backtest)
+
+            st.subheader("Historical Performance")
+            st.line_chart(backtest["equity"][[symbol for symbol in histories if symbol in backtest["equity"]]])
+            table = backtest["metrics"].copy()
+            for column in ("total_return", "cagr", "volatility", "max_drawdown"):
+                table[column] = (table[column] * 100).map(lambda value: f"{value:.1f}%" if value == value else "n/a")
+            table["sharpe"] = table["sharpe"].map("{:.2f}".format)
+            st.dataframe(table, use_container_width=True)
+
         prompt = f"""
 You are a helpful stock assistant.
 
@@ -142,23 +112,26 @@ Focus on:
 - Differences in business type
 - Growth vs stability
 - Risk vs reward
+- Past returns, volatility and drawdowns, without promising they repeat
 
 
 {summary1}
 {summary2}
+{performance}
 """
 
-        response = model.generate_content(
+        st.subheader("AI Stock Comparison")
+
+        response_text = st.write_stream(stream_generate(
+            get_gemini_model(),
             prompt,
             generation_config={
                 "temperature": 0.4,
                 "max_output_tokens": 2000
-            }
-        )
+            },
+            label="comparison",
+            cached=True
+        ))
 
-        st.subheader("AI Stock Comparison")
-
-        if response and hasattr(response, "text") and response.text:
-            st.write(response.text)
-        else:
+        if not response_text:
             st.warning("AI returned no valid text.")
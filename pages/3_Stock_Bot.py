@@ -1,130 +1,120 @@
 import streamlit as st
-import google.generativeai as genai
 
 from functions import (
-    safe_api_call,
-    reset_key_index,
-    get_stock_quote,
-    get_company_overview,
+    Stock,
+    fetch_bundle,
+    stream_generate,
+    generate,
+    resolve_tickers,
+    parse_ticker_list,
+    start_prewarmer,
+    get_gemini_model,
+    ChatMemory,
 )
 
-
-
-genai.configure(api_key=st.secrets["GOOGLE_API_KEY"])
-model = genai.GenerativeModel("models/gemini-2.0-flash")
-
 BOT_AVATAR = "https://i.insider.com/601448566dfbe10018e00c5d?width=700"
+LOOKUP_DEADLINE = 8
+PAGE_SIZE = 20
 
 st.set_page_config(page_title="Stock Chat Bot", page_icon="🤖", layout="wide")
+start_prewarmer()
 st.title("🤖📈 Stocky the Stock Chat Bot")
 
 
 
-if "messages" not in st.session_state:
-    st.session_state.messages = []
-    st.session_state.messages.append({
-        "role": "assistant",
-        "content": "Hi, I’m Stocky! Ask me about any specific stocks!"
-    })
-
-for m in st.session_state.messages:
-    avatar = BOT_AVATAR if m["role"] == "assistant" else None
-    with st.chat_message(m["role"], avatar=avatar):
-        st.write(m["content"])
-
-
+if "memory" not in st.session_state:
+    st.session_state.memory = ChatMemory("Hi, I’m Stocky! Ask me about any specific stocks!")
+    st.session_state.visible_messages = PAGE_SIZE
 
-class Stock:
-    def __init__(self, symbol, quote_data, company_data):
-        self.symbol = symbol
-        self.quote_data = quote_data
-        self.company_data = company_data
+memory = st.session_state.memory
 
-    def summary(self):
-        text = f"\n=== {self.symbol} ===\n"
 
-        price_keys = {
-            "05. price": "Price",
-            "02. open": "Open",
-            "03. high": "High",
-            "04. low": "Low",
-            "10. change percent": "Change %"
-        }
+def show_earlier():
+    st.session_state.visible_messages += PAGE_SIZE
 
-        for key, label in price_keys.items():
-            if key in self.quote_data:
-                text += f"{label}: {self.quote_data[key]}\n"
 
-        text += "\n"
+# only the newest page of messages is rendered on each rerun
+hidden = len(memory.messages) - st.session_state.visible_messages
+if hidden > 0:
+    st.button(f"Show {min(hidden, PAGE_SIZE)} earlier messages", on_click=show_earlier)
 
-        company_keys = {
-            "Name": "Name",
-            "Sector": "Sector",
-            "Industry": "Industry",
-            "MarketCapitalization": "Market Cap",
-            "PERatio": "P/E",
-            "EPS": "EPS",
-            "Beta": "Beta",
-        }
-
-        for key, label in company_keys.items():
-            if key in self.company_data:
-                text += f"{label}: {self.company_data[key]}\n"
+for m in memory.messages[-st.session_state.visible_messages:]:
+    avatar = BOT_AVATAR if m["role"] == "assistant" else None
+    with st.chat_message(m["role"], avatar=avatar):
+        st.write(m["content"])
 
-        return text
 
 
 user_text = st.chat_input("Ask about a stock ticker (AAPL, MSFT, TSLA)...")
 
 if user_text:
-    st.session_state.messages.append({"role": "user", "content": user_text})
+    model = get_gemini_model()
+    memory.add("user", user_text)
     with st.chat_message("user"):
         st.write(user_text)
 
  
 
 
-    extract_prompt = f"""
+    tickers, confident = resolve_tickers(user_text)
+
+    if not confident:
+        previous = f"Earlier in the chat we discussed: {', '.join(memory.focus)}.\n" if memory.focus else ""
+        extract_prompt = f"""
 Given this message: "{user_text}"
-Extract stock tickers mentioned by symbol or company name.
+{previous}Extract stock tickers mentioned by symbol or company name.
+If the message is a follow-up about the stocks discussed earlier, return those.
 Return them in FULL CAPS, separated by commas.
 If none found, return "NONE".
 """
 
-    try:
-        out = model.generate_content(extract_prompt).text.strip().upper()
-        tickers = [] if out == "NONE" else [t.strip() for t in out.split(",")]
-    except:
-        tickers = []
+        try:
+            out = generate(model, extract_prompt, label="ticker_extraction").text
+            tickers = list(dict.fromkeys(tickers + parse_ticker_list(out)))
+        except Exception as e:
+            print("Ticker extraction error:", e)
+
+    if not tickers:
+        tickers = list(memory.focus)
 
     if not tickers:
         msg = "Please mention a valid stock ticker so I can look it up."
-        st.session_state.messages.append({"role": "assistant", "content": msg})
+        memory.add("assistant", msg)
         with st.chat_message("assistant", avatar=BOT_AVATAR):
             st.write(msg)
         st.stop()
 
 
-    reset_key_index()
     summaries = ""
+    missing = []
+    stocks = memory.known(tickers)
 
-    for t in tickers:
-        quote = safe_api_call(get_stock_quote, t)
-        company = safe_api_call(get_company_overview, t)
+    to_fetch = [t for t in tickers if t not in stocks]
+    if to_fetch:
+        bundle, failed = fetch_bundle(to_fetch, ["quote", "overview"], timeout=LOOKUP_DEADLINE)
 
- 
-        if not quote or not company:
-            st.error("AlphaVantage API limit reached or all API keys exhausted.")
-            st.stop()
+        for t in to_fetch:
+            quote = bundle[t].get("quote")
+            company = bundle[t].get("overview")
 
-        stock = Stock(t, quote, company)
-        summaries += stock.summary()
+            if quote or company:
+                stocks[t] = Stock(t, quote or {}, company or {})
 
-    
+    for t in tickers:
+        if t not in stocks:
+            missing.append(t)
+            continue
+        summaries += stocks[t].summary() + "\n"
+
+    if len(missing) == len(tickers):
+        st.error("AlphaVantage API limit reached or all API keys exhausted.")
+        st.stop()
 
+    if missing:
+        summaries += f"\nNo data could be retrieved for: {', '.join(missing)}\n"
 
-    last_msgs = st.session_state.messages[-6:]
-    convo = "\n".join(f"{m['role']}: {m['content']}" for m in last_msgs)
+    memory.remember([stocks[t] for t in tickers if t in stocks])
+    convo = memory.context()
 
 
 
@@ -144,19 +134,24 @@ Rules:
 - Keep the response clear and simple.
 """
 
-    try:
-        ai_response = model.generate_content(
-            ai_prompt,
-            generation_config={
-                "temperature": 0.4,
-                "max_output_tokens": 350
-            }
-        )
-        reply = ai_response.text.strip() if ai_response and ai_response.text else "I couldn't generate a response."
-    except Exception as e:
-        reply = f"Gemini Error: {e}"
-
-    st.session_state.messages.append({"role": "assistant", "content": reply})
-
     with st.chat_message("assistant", avatar=BOT_AVATAR):
-        st.write(reply)
+        try:
+            reply = st.write_stream(stream_generate(
+                model,
+                ai_prompt,
+                generation_config={
+                    "temperature": 0.4,
+                    "max_output_tokens": 350
+                },
+                label="chat"
+            ))
+            reply = reply.strip() if reply else ""
+            if not reply:
+                reply = "I couldn't generate a response."
+                st.write(reply)
+        except Exception as e:
+            reply = f"Gemini Error: {e}"
+            st.write(reply)
+
+    memory.add("assistant", reply)
+    memory.compact(model)
@@ -0,0 +1,89 @@
+import streamlit as st
+import sys
+from pathlib import Path
+ROOT = str(Path(__file__).parent.parent)
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+from functions import get_quotes, start_prewarmer
+
+st.set_page_config(page_title="Watchlist", page_icon="👀", layout="wide")
+start_prewarmer()
+
+st.title("Watchlist")
+st.write("Track a list of stocks side by side. Click a column header to sort.")
+
+DEFAULT_WATCHLIST = "AAPL, MSFT, GOOGL, AMZN, NVDA, META, TSLA, JPM, V, KO"
+
+if "watchlist" not in st.session_state:
+    st.session_state.watchlist = DEFAULT_WATCHLIST
+
+watchlist_text = st.sidebar.text_area(
+    "Symbols",
+    st.session_state.watchlist,
+    height=200,
+    help="Separate symbols with commas, spaces or new lines"
+)
+st.session_state.watchlist = watchlist_text
+
+symbols = list(dict.fromkeys(
+    s.strip().upper() for s in watchlist_text.replace(",", " ").split() if s.strip()
+))
+
+
+def to_number(value):
+    try:
+        return float(str(value).rstrip("%"))
+    except (TypeError, ValueError):
+        return None
+
+
+if st.sidebar.button("Refresh Quotes", type="primary") and symbols:
+    import pandas as pd
+
+    with st.spinner(f"Fetching {len(symbols)} quotes..."):
+        quotes, failed = get_quotes(symbols)
+
+    rows = []
+    for symbol, quote in quotes.items():
+        rows.append({
+            "Symbol": symbol,
+            "Price": to_number(quote.get("05. price")),
+            "Change": to_number(quote.get("09. change")),
+            "Change %": to_number(quote.get("10. change percent")),
+            "Open": to_number(quote.get("02. open")),
+            "High": to_number(quote.get("03. high")),
+            "Low": to_number(quote.get("04. low")),
+            "Previous Close": to_number(quote.get("08. previous close")),
+            "Volume": to_number(quote.get("06. volume")),
+            "Latest Trading Day": quote.get("07. latest trading day", "N/A"),
+        })
+
+    if rows:
+        df = pd.DataFrame(rows)
+        st.dataframe(
+            df,
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                "Price": st.column_config.NumberColumn(format="$%.2f"),
+                "Change": st.column_config.NumberColumn(format="%.2f"),
+                "Change %": st.column_config.NumberColumn(format="%.2f%%"),
+                "Open": st.column_config.NumberColumn(format="$%.2f"),
+                "High": st.column_config.NumberColumn(format="$%.2f"),
+                "Low": st.column_config.NumberColumn(format="$%.2f"),
+                "Previous Close": st.column_config.NumberColumn(format="$%.2f"),
+                "Volume": st.column_config.NumberColumn(format="%d"),
+            }
+        )
+    else:
+        st.error("Could not fetch any quotes. API keys may be exhausted.")
+
+    if failed:
+        st.warning("No data for: " + ", ".join(symbol for symbol, reason in failed))
+
+with st.expander("How to Use the Watchlist"):
+    st.write("""
+    1. Enter symbols in the sidebar
+    2. Click Refresh Quotes
+    3. Sort the table by any column
+    """)
@@ -0,0 +1,102 @@
+import streamlit as st
+import time
+import sys
+from pathlib import Path
+ROOT = str(Path(__file__).parent.parent)
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+from functions import (
+    get_fundamentals_store,
+    start_fundamentals_ingest,
+    current_fundamentals_ingest,
+    start_prewarmer,
+)
+
+st.set_page_config(page_title="Stock Screener", page_icon="🔎", layout="wide")
+start_prewarmer()
+
+st.title("Stock Screener")
+st.write("Filter and sort every company we have fundamentals for.")
+
+COLUMNS = {
+    "name": "Name",
+    "sector": "Sector",
+    "industry": "Industry",
+    "market_cap": "Market Cap",
+    "pe": "P/E",
+    "forward_pe": "Forward P/E",
+    "eps": "EPS",
+    "beta": "Beta",
+    "dividend_yield": "Dividend Yield",
+    "profit_margin": "Profit Margin",
+    "revenue_growth": "Revenue Growth YoY",
+    "earnings_growth": "Earnings Growth YoY",
+}
+
+df = get_fundamentals_store().load()
+
+st.sidebar.header("Data")
+job = current_fundamentals_ingest()
+if st.sidebar.button("Refresh Fundamentals"):
+    job = start_fundamentals_ingest()
+if job is not None:
+    progress = job.progress()
+    if progress["running"]:
+        st.sidebar.progress(
+            progress["done"] / max(progress["total"], 1),
+            text=f"Fetched {progress['done']} of {progress['total']} ({progress['failed']} failed)"
+        )
+    else:
+        st.sidebar.caption(
+            f"Last refresh: {progress['done']} fetched, {progress['failed']} failed, "
+            f"{progress['skipped']} already fresh"
+        )
+
+if df.empty:
+    st.info("No fundamentals cached yet. Click Refresh Fundamentals or look up a few stocks on the other pages.")
+    st.stop()
+
+st.sidebar.header("Filters")
+sectors = st.sidebar.multiselect("Sector", sorted(df["sector"].dropna().unique()))
+min_cap = st.sidebar.number_input("Min Market Cap ($B)", min_value=0.0, value=0.0, step=10.0)
+pe_range = st.sidebar.slider("P/E Ratio", 0.0, 200.0, (0.0, 200.0))
+min_yield = st.sidebar.number_input("Min Dividend Yield (%)", min_value=0.0, value=0.0, step=0.5)
+max_beta = st.sidebar.number_input("Max Beta", min_value=0.0, value=5.0, step=0.1)
+min_growth = st.sidebar.number_input("Min Revenue Growth YoY (%)", value=-100.0, step=5.0)
+
+sort_by = st.sidebar.selectbox("Sort By", list(COLUMNS), index=3, format_func=COLUMNS.get)
+ascending = st.sidebar.checkbox("Ascending", value=False)
+
+start = time.perf_counter()
+mask = (
+    (df["market_cap"].fillna(0) >= min_cap * 1e9)
+    & (df["dividend_yield"].fillna(0) >= min_yield / 100)
+    & (df["beta"].isna() | (df["beta"] <= max_beta))
+    & (df["revenue_growth"].isna() | (df["revenue_growth"] >= min_growth / 100))
+)
+if pe_range != (0.0, 200.0):
+    mask &= df["pe"].between(*pe_range)
+if sectors:
+    mask &= df["sector"].isin(sectors)
+result = df.loc[mask, list(COLUMNS)].sort_values(sort_by, ascending=ascending, na_position="last")
+elapsed = (time.perf_counter() - start) * 1000
+
+st.caption(f"{len(result):,} of {len(df):,} companies match ({elapsed:.1f} ms)")
+st.dataframe(
+    result.rename(columns=COLUMNS),
+    use_container_width=True,
+    column_config={
+        "Market Cap": st.column_config.NumberColumn(format="compact"),
+        "Dividend Yield": st.column_config.NumberColumn(format="percent"),
+        "Profit Margin": st.column_config.NumberColumn(format="percent"),
+        "Revenue Growth YoY": st.column_config.NumberColumn(format="percent"),
+        "Earnings Growth YoY": st.column_config.NumberColumn(format="percent"),
+    }
+)
+
+with st.expander("How to Use the Screener"):
+    st.write("""
+    1. Click Refresh Fundamentals to load the symbol universe (uses spare API budget)
+    2. Narrow the list with the sidebar filters
+    3. Sort by any metric
+    """)